@@ -0,0 +1,370 @@
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+import degrees
+from util import Node, QueueFrontier, DequeFrontier
+
+PAIRS = 50
+SEED = 50
+CONSONANTS = "bcdfghjklmnprstvwyz"
+VOWELS = "aeiouy"
+
+
+def main():
+    commands = {
+        "generate": generate_command,
+        "bidirectional": bidirectional_command,
+        "frontier": frontier_command,
+        "memory": memory_command,
+        "rss": rss_command,
+        "startup": startup_command,
+        "throughput": throughput_command,
+        "names": names_command,
+    }
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        sys.exit(f"Usage: python benchmark_degrees.py [{'|'.join(commands)}] ...")
+    commands[sys.argv[1]](sys.argv[2:])
+
+
+def generate_command(args):
+    """
+    Write a synthetic dataset: generate directory [people] [movies] [seed]
+    """
+    if len(args) not in range(1, 5):
+        sys.exit("Usage: python benchmark_degrees.py generate directory [people] [movies] [seed]")
+    n_people = int(args[1]) if len(args) > 1 else 10000
+    n_movies = int(args[2]) if len(args) > 2 else n_people // 2
+    seed = int(args[3]) if len(args) > 3 else SEED
+    generate(args[0], n_people, n_movies, seed)
+    print(f"Wrote {n_people} people and {n_movies} movies to {args[0]}.")
+
+
+def generate(directory, n_people, n_movies, seed=SEED, cast=4):
+    """
+    Write people.csv, movies.csv and stars.csv into `directory`,
+    casting about `cast` random people in each movie.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(n_people):
+            # Short syllable names collide often enough to be ambiguous
+            name = f"{syllable_name(rng, 1, 2)} {syllable_name(rng, 2, 3)}"
+            writer.writerow([str(i), name, str(rng.randint(1900, 2000))])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(n_movies):
+            writer.writerow([str(i), f"Movie {i}", str(rng.randint(1920, 2020))])
+
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for i in range(n_movies):
+            for person in rng.sample(range(n_people), rng.randint(1, cast * 2 - 1)):
+                writer.writerow([str(person), str(i)])
+
+
+def syllable_name(rng, shortest, longest):
+    """
+    Return a capitalized name of `shortest` to `longest` random syllables.
+    """
+    syllables = []
+    for _ in range(rng.randint(shortest, longest)):
+        syllable = rng.choice(CONSONANTS) + rng.choice(VOWELS)
+        if rng.random() < 0.3:
+            syllable += rng.choice(CONSONANTS)
+        syllables.append(syllable)
+    return "".join(syllables).capitalize()
+
+
+def load(directory, **options):
+    """
+    Load `directory` into the degrees module, returning the load time.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory, **options)
+    return time.perf_counter() - start
+
+
+def random_pairs(count, seed=SEED):
+    """
+    Return `count` seeded random (source, target) pairs of person ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(count)]
+
+
+def count_expansions(function, *args, **kwargs):
+    """
+    Call `function`, counting calls to degrees.neighbors_for_person.
+    Return (result, expansions, seconds).
+    """
+    original = degrees.neighbors_for_person
+    expansions = 0
+
+    def counting(person_id):
+        nonlocal expansions
+        expansions += 1
+        return original(person_id)
+
+    degrees.neighbors_for_person = counting
+    try:
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        seconds = time.perf_counter() - start
+    finally:
+        degrees.neighbors_for_person = original
+    return result, expansions, seconds
+
+
+def bidirectional_command(args):
+    """
+    Compare BFS and bidirectional search: bidirectional [directory] [pairs] [seed]
+    """
+    directory = args[0] if len(args) > 0 else "large"
+    pairs = int(args[1]) if len(args) > 1 else PAIRS
+    seed = int(args[2]) if len(args) > 2 else SEED
+
+    print(f"Loaded {directory} in {load(directory):.2f}s.")
+    totals = {False: [0, 0.0], True: [0, 0.0]}
+    for source, target in random_pairs(pairs, seed):
+        lengths = set()
+        for bidirectional in totals:
+            path, expansions, seconds = count_expansions(
+                degrees.shortest_path, source, target, bidirectional=bidirectional
+            )
+            totals[bidirectional][0] += expansions
+            totals[bidirectional][1] += seconds
+            lengths.add(None if path is None else len(path))
+        if len(lengths) != 1:
+            sys.exit(f"Path lengths disagree for {source} -> {target}: {lengths}")
+
+    print(f"{'Search':<16}{'Expansions':>14}{'Seconds':>12}")
+    for bidirectional, (expansions, seconds) in totals.items():
+        name = "bidirectional" if bidirectional else "bfs"
+        print(f"{name:<16}{expansions:>14}{seconds:>12.3f}")
+    speedup = totals[False][1] / max(totals[True][1], 1e-9)
+    print(f"Speedup over {pairs} pairs: {speedup:.1f}x")
+
+
+def frontier_command(args):
+    """
+    Measure frontier expansion rate as it grows: frontier [max size] [operations]
+    """
+    max_size = int(args[0]) if len(args) > 0 else 20000
+    operations = int(args[1]) if len(args) > 1 else 500
+
+    print(f"{'Size':>10}{'QueueFrontier':>16}{'DequeFrontier':>16}   (expansions/sec)")
+    sizes = [10 ** exponent for exponent in range(2, 9) if 10 ** exponent < max_size]
+    for size in sizes + [max_size]:
+        rates = [
+            frontier_rate(frontier_class, size, operations)
+            for frontier_class in (QueueFrontier, DequeFrontier)
+        ]
+        print(f"{size:>10}{rates[0]:>16.0f}{rates[1]:>16.0f}")
+
+
+def frontier_rate(frontier_class, size, operations):
+    """
+    Return how many BFS-style expansions per second a frontier of
+    `size` nodes sustains: one remove, then a contains_state check
+    and an add for each of a handful of neighbors.
+    """
+    frontier = frontier_class()
+    for state in range(size):
+        frontier.add(Node(state=state, parent=None, action=None))
+
+    next_state = size
+    start = time.perf_counter()
+    for _ in range(operations):
+        node = frontier.remove()
+        for _ in range(4):
+            # Half of the neighbors are already waiting in the frontier
+            if frontier.contains_state(node.state + size // 2):
+                continue
+            frontier.add(Node(state=next_state, parent=node, action=None))
+            next_state += 1
+    return operations / (time.perf_counter() - start)
+
+
+def memory_command(args):
+    """
+    Compare peak RSS of the dict and compact backends: memory [directory] [pairs]
+    """
+    directory = args[0] if len(args) > 0 else "large"
+    pairs = args[1] if len(args) > 1 else str(PAIRS)
+
+    # Load each backend in a fresh interpreter so peaks do not mix
+    print(f"{'Backend':<10}{'Peak RSS (MB)':>16}{'Load (s)':>12}{'Search (s)':>12}")
+    for backend in ["none", "dict", "compact"]:
+        rss, load_seconds, search_seconds = run_backend(directory, backend, pairs)
+        print(f"{backend:<10}{rss / 1024:>16.1f}{load_seconds:>12.2f}{search_seconds:>12.3f}")
+
+
+def startup_command(args):
+    """
+    Compare startup time of the CSV and snapshot loaders: startup [directory]
+    """
+    directory = args[0] if len(args) > 0 else "large"
+    snapshot = os.path.join(directory, degrees.SNAPSHOT)
+    if os.path.exists(snapshot):
+        os.remove(snapshot)
+
+    # The first snapshot run parses the CSV files and writes the snapshot
+    print(f"{'Load':<22}{'Seconds':>10}{'Peak RSS (MB)':>16}")
+    for name, backend in [("current (dict)", "dict"),
+                          ("cold (csv + write)", "snapshot"),
+                          ("warm (snapshot)", "snapshot")]:
+        rss, load_seconds, _ = run_backend(directory, backend, "0")
+        print(f"{name:<22}{load_seconds:>10.2f}{rss / 1024:>16.1f}")
+
+
+def run_backend(directory, backend, pairs):
+    """
+    Run the rss command in a fresh interpreter so that peaks and caches
+    do not mix. Return (peak RSS in KB, load seconds, search seconds).
+    """
+    output = subprocess.run(
+        [sys.executable, __file__, "rss", directory, backend, pairs],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    return tuple(float(value) for value in output)
+
+
+def rss_command(args):
+    """
+    Load one backend and print peak RSS in KB, load and search seconds:
+    rss directory none|dict|compact|snapshot pairs
+    """
+    directory, backend, pairs = args
+    options = {
+        "none": None,
+        "dict": {},
+        "compact": {"compact": True},
+        "snapshot": {"snapshot": True},
+    }[backend]
+    load_seconds = search_seconds = 0.0
+    if options is not None:
+        load_seconds = load(directory, **options)
+        start = time.perf_counter()
+        for source, target in random_pairs(int(pairs)):
+            degrees.shortest_path(source, target)
+        search_seconds = time.perf_counter() - start
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(rss, load_seconds, search_seconds)
+
+
+def throughput_command(args):
+    """
+    Measure batch and server queries per second: throughput [directory] [queries] [workers]
+    """
+    directory = args[0] if len(args) > 0 else "large"
+    queries = int(args[1]) if len(args) > 1 else 200
+    workers = int(args[2]) if len(args) > 2 else 4
+
+    print(f"Loaded {directory} in {load(directory, compact=True):.2f}s.")
+
+    # Only ask about people whose names are unambiguous
+    pairs = []
+    for source, target in random_pairs(queries * 4):
+        names = [degrees.people[source]["name"], degrees.people[target]["name"]]
+        if all(len(degrees.names[name.lower()]) == 1 for name in names):
+            pairs.append(names)
+        if len(pairs) == queries:
+            break
+
+    print(f"{'Mode':<24}{'Queries':>10}{'Seconds':>10}{'Queries/sec':>14}")
+    for bidirectional in [False, True]:
+        lines = io.StringIO("".join(f"{source}\t{target}\n" for source, target in pairs))
+        start = time.perf_counter()
+        count = degrees.run_batch(lines, io.StringIO(), bidirectional)
+        seconds = time.perf_counter() - start
+        name = "batch bidirectional" if bidirectional else "batch"
+        print(f"{name:<24}{count:>10}{seconds:>10.2f}{count / seconds:>14.1f}")
+
+    server = degrees.make_server(0, workers, bidirectional=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://localhost:{server.server_address[1]}/path?"
+
+    def fetch(pair):
+        with urlopen(url + urlencode({"source": pair[0], "target": pair[1]})) as response:
+            return json.load(response)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as clients:
+            count = sum(1 for _ in clients.map(fetch, pairs))
+        seconds = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+    name = f"server ({workers} threads)"
+    print(f"{name:<24}{count:>10}{seconds:>10.2f}{count / seconds:>14.1f}")
+
+
+def names_command(args):
+    """
+    Measure name lookup latency: names [directory] [queries] [seed]
+    """
+    directory = args[0] if len(args) > 0 else "large"
+    queries = int(args[1]) if len(args) > 1 else 1000
+    seed = int(args[2]) if len(args) > 2 else SEED
+
+    seconds = load(directory, compact=True)
+    start = time.perf_counter()
+    degrees.name_index = degrees.NameIndex()
+    print(f"Loaded {directory} in {seconds:.2f}s, indexed names in "
+          f"{time.perf_counter() - start:.2f}s.")
+
+    # Exact names, prefixes of them, and names with one character dropped
+    rng = random.Random(seed)
+    sample = rng.sample(sorted(degrees.names), min(queries, len(degrees.names)))
+    lookups = {
+        "exact": sample,
+        "prefix": [name[:max(1, len(name) * 2 // 3)] for name in sample],
+        "typo": [typo(name, rng) for name in sample],
+    }
+
+    print(f"{'Lookup':<10}{'Mean (ms)':>12}{'p99 (ms)':>12}{'Found':>8}")
+    for kind, names in lookups.items():
+        times = []
+        found = 0
+        for name in names:
+            start = time.perf_counter()
+            found += bool(degrees.resolve_name(name))
+            times.append((time.perf_counter() - start) * 1000)
+        times.sort()
+        p99 = times[min(len(times) - 1, len(times) * 99 // 100)]
+        print(f"{kind:<10}{sum(times) / len(times):>12.3f}{p99:>12.3f}{found:>8}")
+
+
+def typo(name, rng):
+    """
+    Return `name` with one random character removed.
+    """
+    if len(name) < 2:
+        return name
+    i = rng.randrange(len(name))
+    return name[:i] + name[i + 1:]
+
+
+if __name__ == "__main__":
+    main()
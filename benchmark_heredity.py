@@ -0,0 +1,385 @@
+import csv
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import heredity
+
+SEED = 50
+SIZES = [3, 5, 7, 9, 15, 50, 100, 500, 1000]
+ASSIGNMENTS = 20000
+
+# Largest family the O(2^n * 3^n) enumeration is timed on
+ENUMERATION_LIMIT = 9
+
+# Parents of each new person are picked among this many people before
+# them, which bounds the treewidth of the pedigree however large it is
+WINDOW = 8
+
+
+def main():
+    commands = {
+        "generate": generate_command,
+        "elimination": elimination_command,
+        "batch": batch_command,
+        "sampling": sampling_command,
+        "enumeration": enumeration_command,
+        "families": families_command,
+        "tables": tables_command,
+        "session": session_command,
+    }
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        sys.exit(f"Usage: python benchmark_heredity.py [{'|'.join(commands)}] ...")
+    commands[sys.argv[1]](sys.argv[2:])
+
+
+def generate_pedigree(size, observed=0.5, founders=0.2, window=WINDOW, seed=SEED):
+    """
+    Return a random pedigree of `size` people in the form `load_data`
+    returns. A `founders` fraction of people have no parents listed, the
+    rest have two parents from among the `window` people before them,
+    and an `observed` fraction of people have a known trait.
+    """
+    rng = random.Random(seed)
+    people = {}
+    names = []
+    for i in range(size):
+        name = f"Person{i}"
+        mother = father = None
+        if i >= 2 and rng.random() >= founders:
+            mother, father = rng.sample(names[-window:], 2)
+        trait = None
+        if rng.random() < observed:
+            trait = rng.random() < 0.3
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        names.append(name)
+    return people
+
+
+def write_pedigree(filename, people):
+    """
+    Write `people` to a CSV file that `load_data` can read.
+    """
+    with open(filename, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "mother", "father", "trait"])
+        for person in people.values():
+            trait = "" if person["trait"] is None else int(person["trait"])
+            writer.writerow([person["name"], person["mother"] or "", person["father"] or "", trait])
+
+
+def generate_command(args):
+    """
+    Write a synthetic pedigree: generate filename [people] [seed]
+    """
+    if len(args) not in range(1, 4):
+        sys.exit("Usage: python benchmark_heredity.py generate filename [people] [seed]")
+    size = int(args[1]) if len(args) > 1 else 10
+    seed = int(args[2]) if len(args) > 2 else SEED
+    write_pedigree(args[0], generate_pedigree(size, seed=seed))
+    print(f"Wrote {size} people to {args[0]}.")
+
+
+def timed(function, *args, **kwargs):
+    """
+    Return (result, seconds) for one call of `function`.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def max_difference(a, b):
+    """
+    Return the largest difference between two sets of probabilities.
+    """
+    return max(
+        abs(a[person][field][value] - b[person][field][value])
+        for person in a for field in a[person] for value in a[person][field]
+    )
+
+
+def elimination_command(args):
+    """
+    Compare enumeration and variable elimination: elimination [sizes...]
+    """
+    sizes = [int(size) for size in args] or SIZES
+
+    print(f"{'People':>8}{'enumerate (s)':>16}{'infer (s)':>12}{'Max diff':>12}")
+    for size in sizes:
+        people = generate_pedigree(size)
+        fast, fast_seconds = timed(heredity.infer, people)
+        if size <= ENUMERATION_LIMIT:
+            slow, slow_seconds = timed(heredity.enumerate_probabilities, people)
+            diff = max_difference(slow, fast)
+            print(f"{size:>8}{slow_seconds:>16.3f}{fast_seconds:>12.4f}{diff:>12.2e}")
+        else:
+            print(f"{size:>8}{'-':>16}{fast_seconds:>12.4f}{'-':>12}")
+
+
+def batch_command(args):
+    """
+    Compare joint_probability and update with batch_joint_probability
+    on random assignments: batch [assignments] [sizes...]
+    """
+    count = int(args[0]) if len(args) > 0 else ASSIGNMENTS
+    sizes = [int(size) for size in args[1:]] or [5, 10, 50, 100]
+
+    print(f"{'People':>8}{'one at a time (/s)':>20}{'batched (/s)':>14}{'Max rel diff':>14}")
+    for size in sizes:
+        people = generate_pedigree(size)
+        pedigree = heredity.Pedigree(people)
+        rng = np.random.default_rng(SEED)
+        genes = rng.integers(3, size=(count, size))
+        traits = rng.integers(2, size=(count, size))
+
+        batched, fast_seconds = timed(heredity.batch_joint_probability, pedigree, genes, traits)
+
+        # The dictionary version needs each assignment as sets of names
+        assignments = [
+            (
+                {name for name, gene in zip(pedigree.names, row) if gene == 1},
+                {name for name, gene in zip(pedigree.names, row) if gene == 2},
+                {name for name, trait in zip(pedigree.names, trait_row) if trait},
+            )
+            for row, trait_row in zip(genes.tolist(), traits.tolist())
+        ]
+        probabilities = {
+            person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+            for person in people
+        }
+
+        def one_at_a_time():
+            results = []
+            for one_gene, two_genes, have_trait in assignments:
+                p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+                heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+                results.append(p)
+            return results
+
+        single, slow_seconds = timed(one_at_a_time)
+        single = np.array(single)
+        nonzero = single > 0
+        diff = np.max(np.abs(batched[nonzero] - single[nonzero]) / single[nonzero])
+        print(f"{size:>8}{count / slow_seconds:>20.0f}{count / fast_seconds:>14.0f}{diff:>14.2e}")
+
+
+def sampling_command(args):
+    """
+    Compare the samplers with exact inference: sampling [people] [samples] [chains] [workers]
+    """
+    size = int(args[0]) if len(args) > 0 else 100
+    samples = int(args[1]) if len(args) > 1 else heredity.SAMPLES
+    chains = int(args[2]) if len(args) > 2 else heredity.CHAINS
+    workers = int(args[3]) if len(args) > 3 else None
+
+    people = generate_pedigree(size)
+    exact = heredity.infer(people)
+    print(f"{size} people, {chains} chains of {samples} samples")
+    print(f"{'Sampler':<12}{'Seconds':>10}{'Max error':>12}{'ESS':>10}{'R-hat':>8}")
+    for method in heredity.SAMPLERS:
+        (probabilities, diagnostics), seconds = timed(
+            heredity.sample_probabilities, people, method, samples, chains, workers, SEED
+        )
+        rhat = f"{diagnostics['rhat']:.3f}" if "rhat" in diagnostics else "-"
+        print(f"{method:<12}{seconds:>10.2f}{max_difference(exact, probabilities):>12.4f}"
+              f"{diagnostics['ess']:>10.0f}{rhat:>8}")
+
+
+def powerset_probabilities(people):
+    """
+    Return gene and trait probabilities the way `heredity.main` first
+    computed them, with nested powersets of sets of names.
+    """
+    probabilities = {
+        person: {"gene": {2: 0, 1: 0, 0: 0}, "trait": {True: 0, False: 0}}
+        for person in people
+    }
+    names = set(people)
+    for have_trait in heredity.powerset(names):
+        fails_evidence = any(
+            (people[person]["trait"] is not None and
+             people[person]["trait"] != (person in have_trait))
+            for person in names
+        )
+        if fails_evidence:
+            continue
+        for one_gene in heredity.powerset(names):
+            for two_genes in heredity.powerset(names - one_gene):
+                p = heredity.joint_probability(people, one_gene, two_genes, have_trait)
+                heredity.update(probabilities, one_gene, two_genes, have_trait, p)
+    heredity.normalize(probabilities)
+    return probabilities
+
+
+def enumeration_command(args):
+    """
+    Compare the enumeration engines by time and peak memory: enumeration [sizes...]
+    """
+    sizes = [int(size) for size in args] or [3, 5, 7]
+    engines = {
+        "powerset": powerset_probabilities,
+        "stream": heredity.stream_probabilities,
+        "batch": heredity.enumerate_probabilities,
+    }
+
+    print(f"{'People':>8}  {'Engine':<10}{'Seconds':>10}{'Peak (KB)':>12}{'Max diff':>12}")
+    for size in sizes:
+        people = generate_pedigree(size)
+        expected = None
+        for name, engine in engines.items():
+            result, seconds = timed(engine, people)
+
+            # Tracing slows allocation down, so measure memory separately
+            tracemalloc.start()
+            engine(people)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            expected = expected or result
+            print(f"{size:>8}  {name:<10}{seconds:>10.3f}{peak / 1024:>12.0f}"
+                  f"{max_difference(expected, result):>12.2e}")
+
+
+def families_command(args):
+    """
+    Time batch mode on generated families: families [families] [people] [workers...]
+    """
+    count = int(args[0]) if len(args) > 0 else 200
+    size = int(args[1]) if len(args) > 1 else 50
+    worker_counts = [int(workers) for workers in args[2:]] or [1, os.cpu_count()]
+
+    directory = tempfile.mkdtemp(prefix="families-")
+    try:
+        for i in range(count):
+            people = generate_pedigree(size, seed=SEED + i)
+            write_pedigree(os.path.join(directory, f"family{i}.csv"), people)
+        families = heredity.family_files(directory)
+
+        print(f"{count} families of {size} people")
+        print(f"{'Workers':>8}{'Seconds':>10}{'Families/s':>12}")
+        for workers in worker_counts:
+            _, seconds = timed(
+                heredity.run_batch, families, io.StringIO(), workers=workers,
+                log=io.StringIO()
+            )
+            print(f"{workers:>8}{seconds:>10.2f}{count / seconds:>12.1f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+def arithmetic_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Return the joint probability the way `joint_probability` first
+    computed it, with arithmetic on PROBS for every person.
+    """
+    prob = 1
+    mutation = heredity.PROBS["mutation"]
+    for person in people:
+        genes = 1 if person in one_gene else 2 if person in two_genes else 0
+        prob *= heredity.PROBS["trait"][genes][person in have_trait]
+        if people[person]["mother"] is None:
+            prob *= heredity.PROBS["gene"][genes]
+            continue
+        passes = []
+        for parent in (people[person]["mother"], people[person]["father"]):
+            share = (1 if parent in one_gene else 2 if parent in two_genes else 0) / 2
+            passes.append(share * (1 - mutation) + (1 - share) * mutation)
+        mother, father = passes
+        if genes == 0:
+            prob *= (1 - mother) * (1 - father)
+        elif genes == 1:
+            prob *= mother * (1 - father) + (1 - mother) * father
+        else:
+            prob *= mother * father
+    return prob
+
+
+def tables_command(args):
+    """
+    Time one assignment with and without compiled tables: tables [assignments] [sizes...]
+    """
+    count = int(args[0]) if len(args) > 0 else ASSIGNMENTS
+    sizes = [int(size) for size in args[1:]] or [5, 10, 50]
+
+    _, compile_seconds = timed(heredity.FactorTables, heredity.probs_fingerprint())
+    heredity.compiled_tables()
+    _, lookup_seconds = timed(lambda: [heredity.compiled_tables() for _ in range(1000)])
+    lookup_seconds /= 1000
+    print(f"Compiling tables: {compile_seconds * 1e6:.1f} us, "
+          f"cached lookup: {lookup_seconds * 1e6:.1f} us")
+
+    print(f"{'People':>8}{'arithmetic (us)':>18}{'tables (us)':>14}{'batched (us)':>15}{'Max rel diff':>14}")
+    for size in sizes:
+        people = generate_pedigree(size)
+        pedigree = heredity.Pedigree(people)
+        rng = np.random.default_rng(SEED)
+        genes = rng.integers(3, size=(count, size))
+        traits = rng.integers(2, size=(count, size))
+        assignments = [
+            (
+                {name for name, gene in zip(pedigree.names, row) if gene == 1},
+                {name for name, gene in zip(pedigree.names, row) if gene == 2},
+                {name for name, trait in zip(pedigree.names, trait_row) if trait},
+            )
+            for row, trait_row in zip(genes.tolist(), traits.tolist())
+        ]
+
+        slow, slow_seconds = timed(
+            lambda: [arithmetic_joint_probability(people, *a) for a in assignments]
+        )
+        fast, fast_seconds = timed(
+            lambda: [heredity.joint_probability(people, *a) for a in assignments]
+        )
+        _, batch_seconds = timed(heredity.batch_joint_probability, pedigree, genes, traits)
+        slow, fast = np.array(slow), np.array(fast)
+        diff = np.max(np.abs(slow - fast) / slow)
+        print(f"{size:>8}{slow_seconds / count * 1e6:>18.2f}{fast_seconds / count * 1e6:>14.2f}"
+              f"{batch_seconds / count * 1e6:>15.3f}{diff:>14.2e}")
+
+
+def session_command(args):
+    """
+    Time observing traits one at a time in an InferenceSession against
+    inferring from scratch: session [people] [observations]
+    """
+    size = int(args[0]) if len(args) > 0 else 500
+    count = int(args[1]) if len(args) > 1 else 20
+
+    people = generate_pedigree(size, observed=0.2)
+    rng = random.Random(SEED)
+    observations = [(rng.choice(list(people)), rng.random() < 0.3) for _ in range(count)]
+    session, build_seconds = timed(heredity.InferenceSession, people)
+    session.probabilities()
+
+    full = one = every = 0
+    diff = 0
+    for person, trait in observations:
+        people[person]["trait"] = trait
+        expected, seconds = timed(heredity.infer, people)
+        full += seconds
+
+        # Time the same observation queried for one person, then everyone
+        _, observe_seconds = timed(session.observe, person, trait)
+        _, seconds = timed(session.probability, person)
+        one += observe_seconds + seconds
+        result, seconds = timed(session.probabilities)
+        every += observe_seconds + seconds
+        diff = max(diff, max_difference(expected, result))
+
+    print(f"{size} people, {count} observations, session built in {build_seconds:.3f}s")
+    print(f"{'Update':<30}{'ms':>10}")
+    print(f"{'infer from scratch':<30}{1000 * full / count:>10.2f}")
+    print(f"{'observe + one person':<30}{1000 * one / count:>10.2f}")
+    print(f"{'observe + everyone':<30}{1000 * every / count:>10.2f}")
+    print(f"Max diff: {diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,432 @@
+import heapq
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import pagerank
+
+SEED = 50
+SIZES = [100, 1000, 10000, 100000]
+DAMPINGS = [0.85, 0.9, 0.95, 0.99]
+
+# Largest corpus the O(N^2) iterate_pagerank is timed on
+SLOW_LIMIT = 2000
+
+
+def main():
+    commands = {
+        "generate": generate_command,
+        "sparse": sparse_command,
+        "sample": sample_command,
+        "crawl": crawl_command,
+        "incremental": incremental_command,
+        "personalized": personalized_command,
+        "trace": trace_command,
+        "solvers": solvers_command,
+        "outofcore": outofcore_command,
+    }
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        sys.exit(f"Usage: python benchmark_pagerank.py [{'|'.join(commands)}] ...")
+    commands[sys.argv[1]](sys.argv[2:])
+
+
+def generate_corpus(size, links=8, dangling=0.05, seed=SEED):
+    """
+    Return a random corpus of `size` pages in the form `crawl` returns,
+    where about `links` links per page favour popular pages and a
+    `dangling` fraction of pages have no links at all.
+    """
+    rng = random.Random(seed)
+    pages = [f"{i}.html" for i in range(size)]
+    corpus = {}
+    for i, page in enumerate(pages):
+        if size == 1 or rng.random() < dangling:
+            corpus[page] = set()
+            continue
+        count = min(size - 1, max(1, int(rng.expovariate(1 / links))))
+
+        # Squaring the draw skews links towards low-numbered pages
+        targets = {pages[int(size * rng.random() ** 2)] for _ in range(count)}
+        corpus[page] = targets - {page}
+    return corpus
+
+
+def write_corpus(directory, corpus):
+    """
+    Write `corpus` to `directory` as HTML pages that `crawl` can read.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for page, links in corpus.items():
+        with open(os.path.join(directory, page), "w") as f:
+            f.write("<!DOCTYPE html>\n<html>\n<body>\n")
+            for link in sorted(links):
+                f.write(f'<a href="{link}">{link}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def generate_command(args):
+    """
+    Write a synthetic corpus: generate directory [pages] [links] [seed]
+    """
+    if len(args) not in range(1, 5):
+        sys.exit("Usage: python benchmark_pagerank.py generate directory [pages] [links] [seed]")
+    size = int(args[1]) if len(args) > 1 else 1000
+    links = int(args[2]) if len(args) > 2 else 8
+    seed = int(args[3]) if len(args) > 3 else SEED
+    write_corpus(args[0], generate_corpus(size, links, seed=seed))
+    print(f"Wrote {size} pages to {args[0]}.")
+
+
+def timed(function, *args, **kwargs):
+    """
+    Return (result, seconds) for one call of `function`.
+    """
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def sparse_command(args):
+    """
+    Compare iterate_pagerank and sparse_pagerank: sparse [sizes...]
+    """
+    sizes = [int(size) for size in args] or SIZES
+
+    print(f"{'Pages':>10}{'Links':>10}{'iterate (s)':>14}{'sparse (s)':>12}{'Max diff':>12}")
+    for size in sizes:
+        corpus = generate_corpus(size)
+        links = sum(len(pages) for pages in corpus.values())
+        fast, fast_seconds = timed(pagerank.sparse_pagerank, corpus, pagerank.DAMPING)
+
+        # The dictionary engine is quadratic, so only time it on small corpora
+        if size <= SLOW_LIMIT:
+            slow, slow_seconds = timed(pagerank.iterate_pagerank, corpus, pagerank.DAMPING)
+            diff = max(abs(slow[page] - fast[page]) for page in corpus)
+            print(f"{size:>10}{links:>10}{slow_seconds:>14.3f}{fast_seconds:>12.3f}{diff:>12.5f}")
+        else:
+            print(f"{size:>10}{links:>10}{'-':>14}{fast_seconds:>12.3f}{'-':>12}")
+
+
+def sample_command(args):
+    """
+    Compare sample_pagerank and vectorized_sample_pagerank: sample [samples] [sizes...]
+    """
+    samples = int(args[0]) if len(args) > 0 else pagerank.SAMPLES
+    sizes = [int(size) for size in args[1:]] or SIZES
+
+    print(f"{'Pages':>10}{'sample (/s)':>14}{'vectorized (/s)':>18}"
+          f"{'Max error':>12}{'Max error (vec)':>17}")
+    for size in sizes:
+        corpus = generate_corpus(size)
+        exact = pagerank.sparse_pagerank(corpus, pagerank.DAMPING, tolerance=1e-10)
+        fast, fast_seconds = timed(
+            pagerank.vectorized_sample_pagerank, corpus, pagerank.DAMPING, samples, seed=SEED
+        )
+        fast_error = max(abs(fast[page] - exact[page]) for page in corpus)
+
+        # Every step of the dictionary sampler is O(N), so keep it small
+        if size <= SLOW_LIMIT:
+            random.seed(SEED)
+            slow, slow_seconds = timed(pagerank.sample_pagerank, corpus, pagerank.DAMPING, samples)
+            slow_error = max(abs(slow[page] - exact[page]) for page in corpus)
+            print(f"{size:>10}{samples / slow_seconds:>14.0f}{samples / fast_seconds:>18.0f}"
+                  f"{slow_error:>12.4f}{fast_error:>17.4f}")
+        else:
+            print(f"{size:>10}{'-':>14}{samples / fast_seconds:>18.0f}{'-':>12}{fast_error:>17.4f}")
+
+
+def crawl_command(args):
+    """
+    Compare crawl and parallel_crawl on a generated corpus: crawl [pages] [workers] [edited]
+    """
+    size = int(args[0]) if len(args) > 0 else 10000
+    workers = int(args[1]) if len(args) > 1 else os.cpu_count()
+    edited = int(args[2]) if len(args) > 2 else size // 100
+
+    directory = tempfile.mkdtemp(prefix="corpus-")
+    try:
+        corpus = generate_corpus(size)
+        write_corpus(directory, corpus)
+        expected = pagerank.crawl(directory)
+
+        runs = [
+            ("crawl", lambda: pagerank.crawl(directory)),
+            ("threads, no cache", lambda: pagerank.parallel_crawl(directory, workers, cache=False)),
+            ("processes, no cache", lambda: pagerank.parallel_crawl(
+                directory, workers, processes=True, cache=False
+            )),
+            ("threads, cold cache", lambda: pagerank.parallel_crawl(directory, workers)),
+            ("threads, warm cache", lambda: pagerank.parallel_crawl(directory, workers)),
+            (f"threads, {edited} edited", lambda: edit_and_crawl(directory, corpus, edited, workers)),
+        ]
+        print(f"{size} pages, {workers} workers")
+        print(f"{'Crawl':<26}{'Seconds':>10}{'Pages/sec':>12}")
+        for name, run in runs:
+            result, seconds = timed(run)
+            if result != expected:
+                sys.exit(f"{name} found different links")
+            print(f"{name:<26}{seconds:>10.3f}{size / seconds:>12.0f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+def edit_and_crawl(directory, corpus, edited, workers):
+    """
+    Rewrite `edited` pages with the same links but new modification
+    times, then crawl again with the cache.
+    """
+    pages = sorted(corpus)[:edited]
+    write_corpus(directory, {page: corpus[page] for page in pages})
+    for page in pages:
+        os.utime(os.path.join(directory, page), ns=(time.time_ns(), time.time_ns() + 1))
+    return pagerank.parallel_crawl(directory, workers)
+
+
+def edit_stream(corpus, updates, edits, seed=SEED):
+    """
+    Yield `updates` random diffs for IncrementalPageRank.update, each
+    adding and removing `edits` links and sometimes adding or removing
+    a page, applying every diff to `corpus` as it goes.
+    """
+    rng = random.Random(seed)
+    pages = sorted(corpus)
+    for update in range(updates):
+        added_pages = []
+        removed_pages = []
+        if rng.random() < 0.25:
+            page = f"new{update}.html"
+            corpus[page] = set()
+            pages.append(page)
+            added_pages.append(page)
+        elif rng.random() < 0.25:
+            page = pages.pop(rng.randrange(len(pages)))
+            del corpus[page]
+            for links in corpus.values():
+                links.discard(page)
+            removed_pages.append(page)
+
+        added_links = []
+        for _ in range(edits):
+            page, link = rng.choice(pages), pages[int(len(pages) * rng.random() ** 2)]
+            if page != link:
+                corpus[page].add(link)
+                added_links.append((page, link))
+        removed_links = []
+        for page in rng.sample(pages, edits):
+            if corpus[page]:
+                link = rng.choice(sorted(corpus[page]))
+                corpus[page].discard(link)
+                removed_links.append((page, link))
+        yield added_pages, removed_pages, added_links, removed_links
+
+
+def incremental_command(args):
+    """
+    Compare recomputing PageRank after every edit with IncrementalPageRank:
+    incremental [pages] [updates] [edits] [tolerance]
+    """
+    size = int(args[0]) if len(args) > 0 else 10000
+    updates = int(args[1]) if len(args) > 1 else 20
+    edits = int(args[2]) if len(args) > 2 else 1
+    tolerance = float(args[3]) if len(args) > 3 else 1e-10
+
+    corpus = generate_corpus(size)
+    ranks = pagerank.sparse_pagerank(corpus, pagerank.DAMPING, tolerance=tolerance)
+    engines = {
+        "recompute": None,
+        "warm power": pagerank.IncrementalPageRank(
+            corpus, pagerank.DAMPING, tolerance, method="power", ranks=ranks
+        ),
+        "push": pagerank.IncrementalPageRank(
+            corpus, pagerank.DAMPING, tolerance, method="push", ranks=ranks
+        ),
+    }
+    seconds = dict.fromkeys(engines, 0.0)
+    errors = dict.fromkeys(engines, 0.0)
+    for diff in edit_stream(corpus, updates, edits):
+        exact = pagerank.sparse_pagerank(corpus, pagerank.DAMPING, tolerance=1e-14)
+        for name, engine in engines.items():
+            if engine is None:
+                result, elapsed = timed(
+                    pagerank.sparse_pagerank, corpus, pagerank.DAMPING, tolerance
+                )
+            else:
+                result, elapsed = timed(engine.update, *diff)
+            seconds[name] += elapsed
+            errors[name] = max(errors[name], max(abs(result[page] - exact[page]) for page in exact))
+
+    print(f"{size} pages, {updates} updates of {edits} added and removed links")
+    print(f"{'Engine':<14}{'ms/update':>12}{'Max error':>12}")
+    for name in engines:
+        print(f"{name:<14}{1000 * seconds[name] / updates:>12.2f}{errors[name]:>12.2e}")
+
+
+def personalized_command(args):
+    """
+    Time top-k personalized PageRank queries: personalized [pages] [queries] [k] [seeds]
+    """
+    size = int(args[0]) if len(args) > 0 else 10000
+    queries = int(args[1]) if len(args) > 1 else 10
+    k = int(args[2]) if len(args) > 2 else 10
+    seed_count = int(args[3]) if len(args) > 3 else 3
+
+    corpus = generate_corpus(size)
+    rng = random.Random(SEED)
+    pages = sorted(corpus)
+    seed_sets = [rng.sample(pages, seed_count) for _ in range(queries)]
+    exact = pagerank.PersonalizedPageRank(corpus, pagerank.DAMPING, tolerance=1e-9)
+    engines = {
+        "push, full": lambda engine, seeds: engine.ranks(seeds),
+        "push, top-k": lambda engine, seeds: engine.top(seeds, k),
+        "monte-carlo, top-k": lambda engine, seeds: engine.top(seeds, k),
+    }
+
+    print(f"{size} pages, {queries} queries of {seed_count} seeds, k = {k}")
+    print(f"{'Query':<20}{'ms/query':>10}{'cached (ms)':>13}{'Recall':>8}{'Rank mass':>11}")
+    for name, run in engines.items():
+        method = name.split(",")[0]
+        engine = pagerank.PersonalizedPageRank(corpus, pagerank.DAMPING, method=method, seed=SEED)
+        seconds = cached = recall = mass = 0
+        for seeds in seed_sets:
+            result, elapsed = timed(run, engine, seeds)
+            seconds += elapsed
+            cached += timed(run, engine, seeds)[1]
+            if isinstance(result, dict):
+                result = heapq.nlargest(k, result.items(), key=lambda item: item[1])
+            ranks = exact.ranks(seeds)
+            best = heapq.nlargest(k, ranks, key=ranks.get)
+
+            # Share of the exact top-k pages found, and of their rank
+            found = {page for page, _ in result}
+            recall += len(found & set(best)) / k
+            mass += sum(ranks.get(page, 0) for page in found) / sum(ranks[page] for page in best)
+        print(f"{name:<20}{1000 * seconds / queries:>10.2f}{1000 * cached / queries:>13.3f}"
+              f"{recall / queries:>8.2f}{mass / queries:>11.4f}")
+
+
+def trace_command(args):
+    """
+    Print the convergence trace of iterate_pagerank and the error of
+    sample_pagerank: trace [pages] [damping] [tolerance] [samples] [trace file]
+    """
+    size = int(args[0]) if len(args) > 0 else 500
+    damping = float(args[1]) if len(args) > 1 else pagerank.DAMPING
+    tolerance = float(args[2]) if len(args) > 2 else pagerank.TOLERANCE
+    samples = int(args[3]) if len(args) > 3 else pagerank.SAMPLES
+    trace = args[4] if len(args) > 4 else None
+
+    corpus = generate_corpus(size)
+    print(f"iterate_pagerank, {size} pages, d = {damping}, tolerance = {tolerance}")
+    print(f"{'Iteration':>10}{'L1':>12}{'L-inf':>12}{'Seconds':>10}{'Max RSS (KB)':>14}")
+    pagerank.iterate_pagerank(
+        corpus, damping, tolerance, trace=trace, callback=lambda record: print(
+            f"{record['iteration']:>10}{record['l1']:>12.2e}{record['linf']:>12.2e}"
+            f"{record['seconds']:>10.3f}{record['max_rss_kb']:>14}"
+        )
+    )
+
+    print(f"sample_pagerank, {samples} samples")
+    print(f"{'Batch':>10}{'Samples':>12}{'Max CI half-width':>20}{'Seconds':>10}")
+    random.seed(SEED)
+    pagerank.sample_pagerank(
+        corpus, damping, samples, callback=lambda record: print(
+            f"{record['batch']:>10}{record['samples']:>12}"
+            f"{record['max_half_width']:>20.4f}{record['seconds']:>10.3f}"
+        )
+    )
+
+
+def solvers_command(args):
+    """
+    Compare the PageRank solvers across damping factors: solvers [pages] [tolerance]
+    """
+    size = int(args[0]) if len(args) > 0 else 10000
+    tolerance = float(args[1]) if len(args) > 1 else 1e-8
+
+    corpus = generate_corpus(size)
+    print(f"{size} pages, tolerance = {tolerance}")
+    print(f"{'Damping':>8}  {'Solver':<14}{'Iterations':>12}{'Seconds':>10}{'Max error':>12}")
+    for damping in DAMPINGS:
+        exact = pagerank.sparse_pagerank(
+            corpus, damping, tolerance=1e-15, max_iterations=100000
+        )
+        for solver in pagerank.SOLVERS:
+            records = []
+            ranks, seconds = timed(
+                pagerank.solve_pagerank, corpus, damping, solver, tolerance,
+                callback=records.append
+            )
+            error = max(abs(ranks[page] - exact[page]) for page in corpus)
+            print(f"{damping:>8}  {solver:<14}{len(records):>12}{seconds:>10.3f}{error:>12.2e}")
+
+
+def random_link_blocks(size, links=8, block_size=pagerank.EDGE_BLOCK, seed=SEED):
+    """
+    Yield (sources, targets) blocks of about `links` random links per
+    page for `size` pages, skewed towards low page ids like
+    `generate_corpus`, without holding the whole graph in memory.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, size, max(1, block_size // links)):
+        pages = np.arange(start, min(size, start + max(1, block_size // links)))
+        counts = rng.poisson(links, len(pages))
+        sources = np.repeat(pages, counts)
+        targets = (size * rng.random(len(sources)) ** 2).astype(np.int64)
+
+        # Like `crawl`, keep each link once and drop links to the same page
+        keys = np.sort(sources * size + targets)
+        keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+        sources, targets = keys // size, keys % size
+        keep = sources != targets
+        yield sources[keep], targets[keep]
+
+
+def outofcore_command(args):
+    """
+    Time out_of_core_pagerank on a generated link graph: outofcore [pages] [links] [tolerance]
+    """
+    size = int(args[0]) if len(args) > 0 else 1000000
+    links = int(args[1]) if len(args) > 1 else 8
+    tolerance = float(args[2]) if len(args) > 2 else 1e-10
+
+    directory = tempfile.mkdtemp(prefix="edges-")
+    try:
+        pages = (f"{i}.html" for i in range(size))
+        graph, seconds = timed(
+            pagerank.EdgeFile.build, directory, pages, random_link_blocks(size, links)
+        )
+        print(f"{size} pages, {graph.link_count} links")
+        print(f"Built edge file in {seconds:.2f} s, "
+              f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} KB")
+
+        records = []
+        rank, seconds = timed(
+            pagerank.out_of_core_pagerank, directory, pagerank.DAMPING, tolerance,
+            callback=records.append
+        )
+        print(f"Ranked in {len(records)} iterations, {seconds:.2f} s "
+              f"({seconds / len(records):.3f} s per iteration), "
+              f"max RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} KB")
+
+        # Check against the in-memory engine when the corpus is small
+        if size <= 100000:
+            edges = np.column_stack((graph.sources, graph.targets))
+            corpus = {f"{i}.html": set() for i in range(size)}
+            for source, target in edges.tolist():
+                corpus[f"{source}.html"].add(f"{target}.html")
+            expected = pagerank.sparse_pagerank(corpus, pagerank.DAMPING, tolerance)
+            ranks = graph.to_dict(rank)
+            print(f"Max diff from sparse_pagerank: "
+                  f"{max(abs(ranks[page] - expected[page]) for page in corpus):.2e}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
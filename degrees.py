@@ -1,7 +1,33 @@
+import argparse
+import bisect
 import csv
+import heapq
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import operator
+import os
+import pickle
+import random
+import struct
 import sys
+import time
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
 
-from util import Node, StackFrontier, QueueFrontier
+from util import Node, DequeFrontier
+
+# Only needed for memory in progress reports, and missing on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,55 +38,1071 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph of who starred in what, used instead of the three
+# dictionaries above when data is loaded with compact=True; they are
+# then read-only views over the graph's per-index lists
+graph = None
+
+# NameIndex over `names`, built by load_data when index_names=True
+name_index = None
+
+# Snapshot file written next to the CSV files, and its header: magic,
+# (mtime, size) of each CSV file, people, movies and star counts, and
+# the byte length of each string table
+SNAPSHOT = "degrees.snapshot"
+SNAPSHOT_MAGIC = b"DEGREES2"
+SNAPSHOT_HEADER = struct.Struct("=8s6q3q6q")
+CSV_FILES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Rows read from a CSV file between progress reports
+CHUNK_SIZE = 100000
+
+
+class CompactGraph():
+    """
+    Person-movie bipartite graph stored as two CSR adjacency lists
+    over dense integer indexes instead of sets of IMDB ids, with each
+    person's name and birth and each movie's title and year kept in
+    lists by index.
+    """
+
+    def __init__(self, person_ids, person_names, births, movie_ids, titles, years,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_order):
+        """
+        Wrap per-index lists of people and movies (movies sorted by id),
+        the CSR offset and edge arrays (or memoryviews) for each side of
+        the graph, and the person indexes in order of lowercase name.
+        """
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.births = births
+        self.movie_ids = movie_ids
+        self.titles = titles
+        self.years = years
+        self.person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.name_order = name_order
+
+    @classmethod
+    def from_stars(cls, person_ids, person_names, births, movie_ids, titles, years,
+                   stars):
+        """
+        Build the graph from per-index lists of people and movies and an
+        iterable of (person_id, movie_id) pairs, skipping pairs whose
+        person or movie is unknown.
+        """
+        # Movies are sorted by id so that movie_position can bisect
+        # instead of keeping a second id dictionary
+        order = sorted(range(len(movie_ids)), key=movie_ids.__getitem__)
+        movie_ids = [movie_ids[i] for i in order]
+        titles = [titles[i] for i in order]
+        years = [years[i] for i in order]
+        del order
+
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        star_people = array("i")
+        star_movies = array("i")
+        for person_id, movie_id in stars:
+            person = person_index.get(person_id)
+            movie = movie_index.get(movie_id)
+            if person is not None and movie is not None:
+                star_people.append(person)
+                star_movies.append(movie)
+        del person_index, movie_index
+
+        person_offsets, person_movies = csr(len(person_ids), star_people, star_movies)
+        movie_offsets, movie_stars = csr(len(movie_ids), star_movies, star_people)
+        name_order = array("i", sorted(
+            range(len(person_ids)), key=lambda i: person_names[i].lower()
+        ))
+        return cls(
+            person_ids, person_names, births, movie_ids, titles, years,
+            person_offsets, person_movies, movie_offsets, movie_stars,
+            name_order
+        )
+
+    def movie_position(self, movie_id):
+        """
+        Return the index of `movie_id`, or None if it is unknown.
+        """
+        i = bisect.bisect_left(self.movie_ids, movie_id)
+        if i < len(self.movie_ids) and self.movie_ids[i] == movie_id:
+            return i
+        return None
+
+    def name_key(self, person):
+        """
+        Return the lowercase name that orders person index `person`
+        in name_order.
+        """
+        return self.person_names[person].lower()
+
+    def people_named(self, key):
+        """
+        Return the person indexes whose lowercase name is `key`.
+        """
+        order = self.name_order
+        start = bisect.bisect_left(order, key, key=self.name_key)
+        end = start
+        while end < len(order) and self.name_key(order[end]) == key:
+            end += 1
+        return order[start:end]
+
+    def path_ids(self, path):
+        """
+        Return a list of (movie_index, person_index) pairs as
+        (movie_id, person_id) pairs.
+        """
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+    def movies_for(self, person):
+        """
+        Return the movie indexes of person index `person` as a
+        zero-copy slice of the edge array.
+        """
+        offsets = self.person_offsets
+        return memoryview(self.person_movies)[offsets[person]:offsets[person + 1]]
+
+    def stars_for(self, movie):
+        """
+        Return the person indexes of movie index `movie` as a
+        zero-copy slice of the edge array.
+        """
+        offsets = self.movie_offsets
+        return memoryview(self.movie_stars)[offsets[movie]:offsets[movie + 1]]
+
+    def neighbors(self, person):
+        """
+        Yield (movie_index, person_index) pairs for people who
+        starred with person index `person`.
+        """
+        for movie in self.movies_for(person):
+            for star in self.stars_for(movie):
+                yield movie, star
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_index, person_index) pairs
+        that connect person indexes source and target.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+
+        # parent_person[i] is -1 until person i is reached
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        parent_person[source] = source
+        frontier = deque([source])
+
+        while frontier:
+            person = frontier.popleft()
+            for movie, star in self.neighbors(person):
+                if parent_person[star] != -1:
+                    continue
+                parent_person[star] = person
+                parent_movie[star] = movie
+                if star == target:
+                    return walk_back(parent_person, parent_movie, source, star)
+                frontier.append(star)
+
+        return None
+
+    def bidirectional_path(self, source, target):
+        """
+        Returns the shortest list of (movie_index, person_index) pairs
+        that connect person indexes source and target, searching from
+        both people and always expanding the smaller frontier.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+
+        # Per side, the distance (-1 until reached) and parent of each
+        # person, as in bidirectional_path over person_ids
+        size = len(self.person_ids)
+        depths = (array("i", [-1]) * size, array("i", [-1]) * size)
+        parent_person = (array("i", [-1]) * size, array("i", [-1]) * size)
+        parent_movie = (array("i", [-1]) * size, array("i", [-1]) * size)
+        depths[0][source] = 0
+        depths[1][target] = 0
+        frontiers = [[source], [target]]
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            reached = depths[side]
+            opposite = depths[1 - side]
+            next_frontier = []
+            best = None
+
+            for person in frontiers[side]:
+                depth = reached[person] + 1
+                for movie, star in self.neighbors(person):
+                    if reached[star] != -1:
+                        continue
+                    reached[star] = depth
+                    parent_person[side][star] = person
+                    parent_movie[side][star] = movie
+                    next_frontier.append(star)
+
+                    if opposite[star] != -1:
+                        length = depth + opposite[star]
+                        if best is None or length < best[0]:
+                            best = (length, star)
+
+            if best is not None:
+                meeting = best[1]
+                path = walk_back(parent_person[0], parent_movie[0], source, meeting)
+
+                # Walk on from the meeting point to the target
+                person = meeting
+                while person != target:
+                    movie = parent_movie[1][person]
+                    person = parent_person[1][person]
+                    path.append((movie, person))
+                return path
+
+            frontiers[side] = next_frontier
+
+        return None
+
+    def restricted_path(self, source, target, blocked_people, blocked_steps):
+        """
+        Returns the shortest list of (movie_index, person_index) pairs
+        that connect person indexes source and target without visiting
+        anyone in `blocked_people` or taking any (movie_index,
+        person_index) step in `blocked_steps` straight out of source.
+
+        If no possible path, returns None.
+        """
+        if source == target:
+            return []
+
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        parent_person[source] = source
+
+        # Blocked people look already reached, so they are never entered
+        for person in blocked_people:
+            parent_person[person] = person
+        frontier = deque([source])
+
+        while frontier:
+            person = frontier.popleft()
+            for movie, star in self.neighbors(person):
+                if parent_person[star] != -1:
+                    continue
+                if person == source and (movie, star) in blocked_steps:
+                    continue
+                parent_person[star] = person
+                parent_movie[star] = movie
+                if star == target:
+                    return walk_back(parent_person, parent_movie, source, star)
+                frontier.append(star)
+
+        return None
+
+    def single_source(self, source):
+        """
+        Run one breadth-first search from person index `source`.
+        Return arrays of (distance, parent person, parent movie) indexes
+        for every person, where -1 marks someone unreachable.
+        """
+        distances = array("i", [-1]) * len(self.person_ids)
+        parent_person = array("i", [-1]) * len(self.person_ids)
+        parent_movie = array("i", [-1]) * len(self.person_ids)
+        distances[source] = 0
+        frontier = deque([source])
+
+        while frontier:
+            person = frontier.popleft()
+            distance = distances[person] + 1
+            for movie, star in self.neighbors(person):
+                if distances[star] != -1:
+                    continue
+                distances[star] = distance
+                parent_person[star] = person
+                parent_movie[star] = movie
+                frontier.append(star)
+
+        return distances, parent_person, parent_movie
+
+    def components(self):
+        """
+        Label the connected components of the co-star graph.
+        Return (labels, sizes): the component of each person index and
+        the number of people in each component.
+        """
+        labels = array("i", [-1]) * len(self.person_ids)
+        seen_movies = bytearray(len(self.movie_ids))
+        sizes = []
+
+        for start in range(len(self.person_ids)):
+            if labels[start] != -1:
+                continue
+            label = len(sizes)
+            labels[start] = label
+            size = 1
+            frontier = deque([start])
+            while frontier:
+                person = frontier.popleft()
+                for movie in self.movies_for(person):
+                    # Each movie's cast only needs to be scanned once
+                    if seen_movies[movie]:
+                        continue
+                    seen_movies[movie] = 1
+                    for star in self.stars_for(movie):
+                        if labels[star] == -1:
+                            labels[star] = label
+                            size += 1
+                            frontier.append(star)
+            sizes.append(size)
+
+        return labels, sizes
+
+    def eccentricity(self, source):
+        """
+        Return the greatest number of degrees between person index
+        `source` and anyone in their component.
+        """
+        distances = array("i", [-1]) * len(self.person_ids)
+        seen_movies = bytearray(len(self.movie_ids))
+        distances[source] = 0
+        frontier = deque([source])
+        farthest = 0
+
+        while frontier:
+            person = frontier.popleft()
+            distance = distances[person] + 1
+            for movie in self.movies_for(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for star in self.stars_for(movie):
+                    if distances[star] == -1:
+                        distances[star] = distance
+                        farthest = distance
+                        frontier.append(star)
+
+        return farthest
+
+
+def walk_back(parent_person, parent_movie, source, person):
+    """
+    Return the (movie_index, person_index) pairs leading from person
+    index `source` to `person` along the parent arrays of a search.
+    """
+    path = []
+    while person != source:
+        path.append((parent_movie[person], person))
+        person = parent_person[person]
+    path.reverse()
+    return path
+
+
+class CompactRecords(Mapping):
+    """
+    Read-only stand-in for `people` or `movies` over a CompactGraph,
+    building each id's dictionary from per-index lists on lookup.
+    """
+
+    def __init__(self, ids, position, fields):
+        """
+        Wrap the per-index list of ids, a function returning the index
+        of an id (or None), and a dictionary of per-index field lists.
+        """
+        self.ids = ids
+        self.position = position
+        self.fields = fields
+
+    def __getitem__(self, key):
+        i = self.position(key)
+        if i is None:
+            raise KeyError(key)
+        return {field: values[i] for field, values in self.fields.items()}
+
+    def __contains__(self, key):
+        return self.position(key) is not None
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class CompactNames(Mapping):
+    """
+    Read-only stand-in for `names` over a CompactGraph, iterating
+    lowercase names in sorted order.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.count = None
+
+    def __getitem__(self, key):
+        person_ids = {self.graph.person_ids[i] for i in self.graph.people_named(key)}
+        if not person_ids:
+            raise KeyError(key)
+        return person_ids
+
+    def __contains__(self, key):
+        return len(self.graph.people_named(key)) > 0
+
+    def __iter__(self):
+        for key, _ in self.items():
+            yield key
+
+    def items(self):
+        """
+        Yield (name, person_ids) pairs in order of name, in one pass.
+        """
+        person_ids = self.graph.person_ids
+        person_names = self.graph.person_names
+        group = None
+        for person in self.graph.name_order:
+            key = person_names[person].lower()
+            if group is None or key != group[0]:
+                if group is not None:
+                    yield group
+                group = (key, set())
+            group[1].add(person_ids[person])
+        if group is not None:
+            yield group
+
+    def __len__(self):
+        if self.count is None:
+            self.count = sum(1 for _ in self)
+        return self.count
+
+
+def csr(size, rows, columns):
+    """
+    Return (offsets, edges) arrays holding, for each row in range(size),
+    the columns paired with it in the parallel arrays `rows` and `columns`.
+    """
+    offsets = array("q", [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    # Fill each row's slice of the edge list in order
+    edges = array("i", [0]) * len(columns)
+    position = offsets[:-1]
+    for row, column in zip(rows, columns):
+        edges[position[row]] = column
+        position[row] += 1
+    return offsets, edges
+
+
+class NameIndex():
+    """
+    Sorted prefix index and trigram index over `names`, used for
+    autocomplete and typo-tolerant lookups that never prompt.
+    """
+
+    def __init__(self):
+        """
+        Index every name currently in `names`.
+        """
+        self.sorted_names = []
+        best = []
+
+        # postings[count][gram] lists the names with `count` trigrams
+        # that contain `gram`. The lists share one int object per name,
+        # which set operations can read without boxing array items
+        self.postings = {}
+        by_name = sorted(names.items(), key=operator.itemgetter(0))
+        for i, (name, person_ids) in enumerate(by_name):
+            self.sorted_names.append(name)
+            best.append(min(map(person_key, person_ids)))
+            grams = trigrams(name)
+            bucket = self.postings.setdefault(len(grams), {})
+            for gram in grams:
+                if gram not in bucket:
+                    bucket[gram] = []
+                bucket[gram].append(i)
+
+        # Tournament tree over sorted_names: leaf i holds the rank of the
+        # best person named sorted_names[i], and every parent the best
+        # rank below it, so any range of names yields its best in O(log n)
+        self.by_rank = array("i", sorted(range(len(best)), key=best.__getitem__))
+        del best
+        size = len(self.by_rank)
+        self.tree = array("i", [0]) * (2 * size)
+        for rank, i in enumerate(self.by_rank):
+            self.tree[size + i] = rank
+        for node in range(size - 1, 0, -1):
+            self.tree[node] = min(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def best_rank(self, start, end):
+        """
+        Return the best rank among the names at positions [start, end)
+        of sorted_names.
+        """
+        tree = self.tree
+        best = len(self.by_rank)
+        start += len(self.by_rank)
+        end += len(self.by_rank)
+        while start < end:
+            if start & 1:
+                best = min(best, tree[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                best = min(best, tree[end])
+            start >>= 1
+            end >>= 1
+        return best
+
+    def resolve(self, name, limit=10):
+        """
+        Return up to `limit` ranked candidates for `name`: exact matches
+        if there are any, otherwise names it is a prefix of, otherwise
+        the closest fuzzy matches.
+        """
+        key = " ".join(name.lower().split())
+        if key in names:
+            return rank_people(names[key], "exact", 1.0)[:limit]
+
+        # Autocomplete first, and fall back on typo-tolerant matching
+        return self.complete(key, limit) or self.fuzzy(key, limit)
+
+    def complete(self, prefix, limit=10):
+        """
+        Return the `limit` best ranked candidates among everyone whose
+        name starts with `prefix`.
+        """
+        prefix = prefix.lower()
+        start = bisect.bisect_left(self.sorted_names, prefix)
+        end = bisect.bisect_left(self.sorted_names, prefix + chr(sys.maxunicode), start)
+
+        # Take names best first, splitting each range of names around
+        # the best one in it, until no name left can beat the results
+        ranges = [(self.best_rank(start, end), start, end)] if start < end else []
+        matches = []
+        while ranges:
+            rank, start, end = heapq.heappop(ranges)
+            i = self.by_rank[rank]
+            name = self.sorted_names[i]
+            candidates = rank_people(names[name], "prefix", len(prefix) / len(name))
+            if len(matches) >= limit and rank_key(candidates[0]) > rank_key(matches[limit - 1]):
+                break
+            matches.extend(candidates)
+            matches.sort(key=rank_key)
+            del matches[limit:]
+            for part in [(start, i), (i + 1, end)]:
+                if part[0] < part[1]:
+                    heapq.heappush(ranges, (self.best_rank(*part), *part))
+        return matches
+
+    def fuzzy(self, name, limit=10, threshold=0.6):
+        """
+        Return up to `limit` ranked candidates whose name shares enough
+        trigrams with `name` (Dice coefficient of at least `threshold`).
+        """
+        grams = trigrams(name.lower())
+        if not grams:
+            return []
 
-def load_data(directory):
+        # A name with `count` trigrams matches if it shares `needed`,
+        # which also bounds the counts worth looking at
+        lowest = threshold * len(grams) / (2 - threshold)
+        highest = len(grams) * (2 - threshold) / threshold
+        matches = []
+        for count, bucket in self.postings.items():
+            if not lowest - 1e-9 <= count <= highest + 1e-9:
+                continue
+            needed = max(1, math.ceil(threshold * (len(grams) + count) / 2 - 1e-9))
+
+            # A match misses at most len(grams) - needed trigrams, so it
+            # is in two of the rarest len(grams) - needed + 2 postings (or
+            # in one, if it only needs one). The common trigrams' postings
+            # are never read
+            postings = sorted([bucket.get(gram, ()) for gram in grams], key=len)
+            seen = set()
+            twice = set()
+            for posting in postings[:len(grams) - needed + 2]:
+                twice.update(seen.intersection(posting))
+                seen.update(posting)
+
+            # Check the few names left against every trigram
+            for i in twice if needed > 1 else seen:
+                padded = f" {self.sorted_names[i]} "
+                score = 2 * sum(map(padded.__contains__, grams)) / (len(grams) + count)
+                if score >= threshold:
+                    matches.extend(rank_people(names[self.sorted_names[i]], "fuzzy", score))
+        matches.sort(key=lambda match: (-match["score"], rank_key(match)))
+        return matches[:limit]
+
+
+def trigrams(name):
+    """
+    Return the set of three-character substrings of `name`,
+    padded with a space so that the start and end of the name count.
+    """
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def movie_count(person_id):
+    """
+    Return the number of movies `person_id` starred in.
+    """
+    if graph is not None:
+        person = graph.person_index[person_id]
+        return graph.person_offsets[person + 1] - graph.person_offsets[person]
+    return len(people[person_id]["movies"])
+
+
+def person_key(person_id):
+    """
+    Return the rank_key of `person_id` without building its candidate.
+    """
+    return (-movie_count(person_id), birth_year(people[person_id]["birth"]), person_id)
+
+
+def rank_key(candidate):
+    """
+    Order candidates by most movies first, then earliest birth year.
+    """
+    return (-candidate["movies"], birth_year(candidate["birth"]), candidate["person_id"])
+
+
+def birth_year(birth):
+    """
+    Return `birth` as a year to rank by, placing unknown years last.
+    """
+    return int(birth) if birth.isdigit() else 10000
+
+
+def rank_people(person_ids, match, score):
+    """
+    Return candidate dicts for `person_ids`, ranked by rank_key.
+    """
+    candidates = [
+        {
+            "person_id": person_id,
+            "name": people[person_id]["name"],
+            "birth": people[person_id]["birth"],
+            "movies": movie_count(person_id),
+            "match": match,
+            "score": round(score, 3),
+        }
+        for person_id in person_ids
+    ]
+    candidates.sort(key=rank_key)
+    return candidates
+
+
+def resolve_name(name, limit=10):
+    """
+    Return ranked candidates for `name` without prompting, using the
+    NameIndex when it is built and exact matches otherwise.
+    """
+    if name_index is not None:
+        return name_index.resolve(name, limit)
+    return rank_people(names.get(name.lower(), set()), "exact", 1.0)[:limit]
+
+
+def load_data(directory, compact=False, snapshot=False, index_names=False,
+              progress=None):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, keep who starred in what in a CompactGraph
+    instead of sets inside `people` and `movies`.
+
+    If `snapshot` is true, load the compact form from a snapshot file
+    in `directory` when it is up to date with the CSV files, and write
+    a fresh one after reading the CSV files otherwise. If the snapshot
+    cannot be written, the data is still loaded, just without a cache.
+
+    If `index_names` is true, also build the NameIndex used to resolve
+    names without prompting.
+
+    `progress` is called with ingestion statistics as each CSV file is
+    read (see read_rows).
     """
+    global names, people, movies, graph, name_index
+    names, people, movies = {}, {}, {}
+    graph = None
+    name_index = None
+
+    if not (snapshot and read_snapshot(directory)):
+        load_csv(directory, compact or snapshot, progress)
+        if snapshot:
+            write_snapshot(directory)
+
+    if index_names:
+        name_index = NameIndex()
+
+
+def load_csv(directory, compact, progress=None):
+    """
+    Load people, movies and stars from the CSV files in `directory`,
+    into a CompactGraph if `compact` is true.
+
+    Ids are interned so that every set and key shares one string per id.
+    """
+    if compact:
+        load_compact(directory, progress)
+        return
+    intern = sys.intern
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in read_rows(
+        directory, "people.csv", ["id", "name", "birth"], progress
+    ):
+        person_id = intern(person_id)
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set(),
+        }
+        key = name.lower()
+        if key not in names:
+            names[key] = {person_id}
+        else:
+            names[key].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in read_rows(
+        directory, "movies.csv", ["id", "title", "year"], progress
+    ):
+        movie_id = intern(movie_id)
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set(),
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+    stars = read_rows(directory, "stars.csv", ["person_id", "movie_id"], progress)
+    for person_id, movie_id in stars:
+        try:
+            people[person_id]["movies"].add(intern(movie_id))
+            movies[movie_id]["stars"].add(intern(person_id))
+        except KeyError:
+            pass
+
+
+def load_compact(directory, progress=None):
+    """
+    Load the CSV files in `directory` into a CompactGraph, keeping each
+    column in a list by index rather than a dictionary per row.
+    """
+    person_ids, person_names, births = [], [], []
+    for person_id, name, birth in read_rows(
+        directory, "people.csv", ["id", "name", "birth"], progress
+    ):
+        person_ids.append(person_id)
+        person_names.append(name)
+        births.append(birth)
+
+    movie_ids, titles, years = [], [], []
+    for movie_id, title, year in read_rows(
+        directory, "movies.csv", ["id", "title", "year"], progress
+    ):
+        movie_ids.append(movie_id)
+        titles.append(title)
+        years.append(year)
+
+    stars = read_rows(directory, "stars.csv", ["person_id", "movie_id"], progress)
+    use_graph(CompactGraph.from_stars(
+        person_ids, person_names, births, movie_ids, titles, years, stars
+    ))
+
+
+def use_graph(compact_graph):
+    """
+    Make `compact_graph` the loaded graph, with `names`, `people` and
+    `movies` as views over it.
+    """
+    global names, people, movies, graph
+    graph = compact_graph
+    names = CompactNames(graph)
+    people = CompactRecords(
+        graph.person_ids, graph.person_index.get,
+        {"name": graph.person_names, "birth": graph.births}
+    )
+    movies = CompactRecords(
+        graph.movie_ids, graph.movie_position,
+        {"title": graph.titles, "year": graph.years}
+    )
+
+
+def read_rows(directory, filename, columns, progress=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield a tuple of the named `columns` for each row of the CSV file
+    `filename` in `directory`, reading `chunk_size` rows at a time.
+
+    After each chunk, and once more at the end, call `progress` (if
+    given) with a dictionary of ingestion statistics for the file.
+    """
+    path = os.path.join(directory, filename)
+    total_bytes = os.path.getsize(path)
+    start = time.perf_counter()
+    start_rss = rss_kb() if progress is not None else None
+    rows = 0
+
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        select = operator.itemgetter(*(header.index(column) for column in columns))
+
+        while True:
+            chunk = list(itertools.islice(reader, chunk_size))
+            if not chunk:
+                break
+            rows += len(chunk)
+            yield from map(select, chunk)
+            if progress is not None:
+                # The OS file position runs at most one read buffer ahead
+                read = os.lseek(f.fileno(), 0, os.SEEK_CUR)
+                progress(ingest_stats(
+                    filename, rows, read, total_bytes, start, start_rss, False
+                ))
+
+    if progress is not None:
+        progress(ingest_stats(
+            filename, rows, total_bytes, total_bytes, start, start_rss, True
+        ))
+
+
+def ingest_stats(filename, rows, read, total_bytes, start, start_rss, done):
+    """
+    Return the statistics passed to a read_rows progress hook, where
+    rss_growth_kb is how far RSS has grown since the file was opened,
+    or None when memory cannot be measured.
+    """
+    seconds = max(time.perf_counter() - start, 1e-9)
+    rss = rss_kb()
+    return {
+        "file": filename,
+        "rows": rows,
+        "bytes": read,
+        "total_bytes": total_bytes,
+        "seconds": seconds,
+        "rows_per_sec": rows / seconds,
+        "bytes_per_sec": read / seconds,
+        "rss_growth_kb": rss - start_rss if None not in (rss, start_rss) else None,
+        "done": done,
+    }
+
+
+def rss_kb():
+    """
+    Return the current resident set size of this process in KB, the
+    peak resident set size where /proc is not available, or None where
+    neither is.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * (os.sysconf("SC_PAGE_SIZE") // 1024)
+    except (OSError, ValueError):
+        pass
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def print_progress(stats, output=None):
+    """
+    Progress hook for load_data that reports each file as it loads.
+    """
+    output = output or sys.stderr
+    percent = 100 * stats["bytes"] / max(stats["total_bytes"], 1)
+    message = (
+        f"{stats['file']}: {stats['rows']} rows ({percent:.0f}%), "
+        f"{stats['rows_per_sec']:.0f} rows/s, "
+        f"{stats['bytes_per_sec'] / 1e6:.1f} MB/s"
+    )
+    if stats["rss_growth_kb"] is not None:
+        message += f", RSS +{stats['rss_growth_kb'] / 1024:.0f} MB"
+    print(
+        message,
+        end="\n" if stats["done"] else "\r",
+        file=output,
+    )
+
+
+def csv_signature(directory):
+    """
+    Return the (mtime, size) of each CSV file in `directory`, flattened.
+    """
+    signature = []
+    for filename in CSV_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        signature.extend([stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def write_snapshot(directory):
+    """
+    Write the loaded compact graph to the snapshot file in `directory`,
+    tagged with the current CSV signature.
+
+    Return False, leaving no partial file behind, if the snapshot could
+    not be written, for example because `directory` is read-only.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+
+    # String tables are NUL-separated so one split restores each list
+    tables = [
+        "\0".join(table).encode("utf-8") for table in [
+            person_ids, graph.person_names, graph.births,
+            movie_ids, graph.titles, graph.years,
+        ]
+    ]
+
+    path = os.path.join(directory, SNAPSHOT)
+    try:
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(
+                SNAPSHOT_MAGIC, *csv_signature(directory),
+                len(person_ids), len(movie_ids), len(graph.person_movies),
+                *(len(table) for table in tables)
+            ))
+
+            # Offsets first so that every array stays aligned in the file
+            for values in [graph.person_offsets, graph.movie_offsets,
+                           graph.person_movies, graph.movie_stars, graph.name_order]:
+                f.write(values)
+            for table in tables:
+                f.write(table)
+
+        # Replace atomically so a concurrent reader never sees half a file
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        try:
+            os.remove(f"{path}.tmp")
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def read_snapshot(directory):
+    """
+    Load a memory-mapped compact graph from the snapshot file in
+    `directory`.
+
+    Return False, loading nothing, if there is no snapshot or the CSV
+    files changed since it was written.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return False
+
+    if len(data) < SNAPSHOT_HEADER.size:
+        return False
+    header = SNAPSHOT_HEADER.unpack_from(data)
+    if header[0] != SNAPSHOT_MAGIC or list(header[1:7]) != csv_signature(directory):
+        return False
+    n_people, n_movies, n_stars = header[7:10]
+
+    # Slice the arrays straight out of the mapping without copying
+    view = memoryview(data)
+    position = SNAPSHOT_HEADER.size
+    arrays = []
+    for typecode, length in [("q", n_people + 1), ("q", n_movies + 1),
+                             ("i", n_stars), ("i", n_stars), ("i", n_people)]:
+        size = length * struct.calcsize(typecode)
+        arrays.append(view[position:position + size].cast(typecode))
+        position += size
+
+    tables = []
+    for count, size in zip([n_people] * 3 + [n_movies] * 3, header[10:]):
+        table = bytes(view[position:position + size]).decode("utf-8")
+        tables.append(table.split("\0") if count else [])
+        position += size
+    person_offsets, movie_offsets, person_movies, movie_stars, name_order = arrays
+    use_graph(CompactGraph(
+        *tables, person_offsets, person_movies, movie_offsets, movie_stars,
+        name_order
+    ))
+    return True
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find degrees of separation between two people."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated name pairs from FILE (- for stdin) as JSON lines")
+    parser.add_argument("--serve", metavar="PORT", type=int,
+                        help="answer HTTP queries on localhost:PORT")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="threads answering server queries")
+    parser.add_argument("--analytics", action="store_true",
+                        help="report components, eccentricity and diameter estimates")
+    parser.add_argument("--samples", type=int, default=100,
+                        help="BFS sources sampled for --analytics")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both people at once")
+    parser.add_argument("--compact", action="store_true",
+                        help="keep the star graph in compact arrays")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="load from and write a binary snapshot of the data")
+    parser.add_argument("--progress", action="store_true",
+                        help="report rows/s, MB/s and memory growth while loading")
+    args = parser.parse_args()
+
+    # Keep stdout for results when it carries JSON
+    log = sys.stderr if args.batch or args.serve is not None else sys.stdout
 
     # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    print("Loading data...", file=log)
+    load_data(
+        args.directory,
+        compact=args.compact or args.analytics,
+        snapshot=args.snapshot,
+        index_names=bool(args.batch) or args.serve is not None,
+        progress=print_progress if args.progress else None,
+    )
+    print("Data loaded.", file=log)
+
+    if args.analytics:
+        run_analytics(args.samples)
+        return
+
+    if args.batch:
+        if args.batch == "-":
+            run_batch(sys.stdin, sys.stdout, args.bidirectional)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(f, sys.stdout, args.bidirectional)
+        return
+    if args.serve is not None:
+        server = make_server(args.serve, args.workers, args.bidirectional)
+        print(f"Serving on http://localhost:{server.server_address[1]}/path", file=log)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,7 +1111,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -84,13 +1126,215 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def query(source_name, target_name, bidirectional=False):
+    """
+    Answer one query without prompting, returning a JSON-ready dict with
+    the number of degrees and the path between two names, or an error.
+    """
+    result = {"source": source_name, "target": target_name}
+    person_ids = []
+    for name in [source_name, target_name]:
+        candidates = resolve_name(name)
+        exact = [candidate for candidate in candidates if candidate["match"] == "exact"]
+        if len(exact) != 1:
+            result["error"] = "not found" if not exact else "ambiguous"
+            result["name"] = name
+            result["candidates"] = candidates
+            return result
+        person_ids.append(exact[0]["person_id"])
+
+    path = shortest_path(*person_ids, bidirectional=bidirectional)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {
+                "movie_id": movie_id,
+                "movie": movies[movie_id]["title"],
+                "person_id": person_id,
+                "person": people[person_id]["name"],
+            }
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def run_batch(lines, output, bidirectional=False):
+    """
+    Answer each "source<TAB>target" line of `lines`, writing one JSON
+    result per line to `output` as soon as it is found.
+    Return the number of queries answered.
+    """
+    count = 0
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        pair = line.split("\t")
+        if len(pair) != 2:
+            result = {"line": line, "error": "expected source and target separated by a tab"}
+        else:
+            result = query(pair[0].strip(), pair[1].strip(), bidirectional)
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        count += 1
+    return count
+
+
+def run_analytics(samples, seed=0, output=None):
+    """
+    Print the connected components of the compact graph, then estimate
+    eccentricity and diameter of the largest component from `samples`
+    random BFS sources, timing the searches with growing worker pools.
+    """
+    output = output or sys.stdout
+    start = time.perf_counter()
+    labels, sizes = graph.components()
+    seconds = time.perf_counter() - start
+    largest = max(range(len(sizes)), key=lambda label: sizes[label], default=None)
+    print(f"{len(sizes)} connected components found in {seconds:.2f}s.", file=output)
+    if largest is None:
+        return
+    print(f"Largest component: {sizes[largest]} of {len(labels)} people.", file=output)
+    print(f"Isolated people: {sizes.count(1)}", file=output)
+
+    members = [i for i, label in enumerate(labels) if label == largest]
+    sources = random.Random(seed).sample(members, min(samples, len(members)))
+
+    # Time the same sample with 1, 2, 4, ... workers up to the core count
+    cores = os.cpu_count() or 1
+    workers = [1]
+    while workers[-1] * 2 < cores:
+        workers.append(workers[-1] * 2)
+    if workers[-1] != cores:
+        workers.append(cores)
+
+    print(f"{'Workers':>8}{'Seconds':>10}{'Speedup':>10}", file=output)
+    baseline = None
+    for count in workers:
+        start = time.perf_counter()
+        eccentricities = sampled_eccentricities(sources, count)
+        seconds = time.perf_counter() - start
+        baseline = baseline or seconds
+        print(f"{count:>8}{seconds:>10.2f}{baseline / seconds:>10.2f}", file=output)
+
+    # Any eccentricity is at most the diameter, which is at most twice the radius
+    print(f"Sampled eccentricity: min {min(eccentricities)}, "
+          f"mean {sum(eccentricities) / len(eccentricities):.2f}, "
+          f"max {max(eccentricities)}", file=output)
+    print(f"Diameter estimate: between {max(eccentricities)} "
+          f"and {2 * min(eccentricities)}", file=output)
+
+
+def sampled_eccentricities(sources, workers):
+    """
+    Return the eccentricity of each person index in `sources`, spread
+    across `workers` forked processes that share the loaded graph.
+    """
+    if workers == 1:
+        return [graph.eccentricity(source) for source in sources]
+
+    # Forked workers inherit `graph`, so tasks only carry an index each
+    context = multiprocessing.get_context("fork")
+    with context.Pool(workers) as pool:
+        return pool.map(
+            eccentricity, sources, chunksize=max(1, len(sources) // (workers * 4))
+        )
+
+
+def eccentricity(source):
+    """
+    Return the eccentricity of person index `source` in the loaded graph.
+    """
+    return graph.eccentricity(source)
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET /path?source=NAME&target=NAME with a JSON result,
+    and GET /names?q=NAME with ranked candidates for a name.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path == "/names" and "q" in params:
+            self.respond(200, {"q": params["q"][0], "candidates": resolve_name(params["q"][0])})
+            return
+        if url.path != "/path" or "source" not in params or "target" not in params:
+            self.respond(404, {"error": "use /path?source=NAME&target=NAME or /names?q=NAME"})
+            return
+        result = query(params["source"][0], params["target"][0], self.server.bidirectional)
+        self.respond(400 if "error" in result else 200, result)
+
+    def respond(self, status, result):
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server that hands each connection to a fixed pool of threads,
+    all reading the same loaded data.
+    """
+
+    def __init__(self, address, handler, workers, bidirectional=False):
+        super().__init__(address, handler)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.bidirectional = bidirectional
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+
+
+def make_server(port, workers=4, bidirectional=False):
+    """
+    Return a PooledHTTPServer answering queries on localhost:`port`.
+    Port 0 picks a free port.
+    """
+    return PooledHTTPServer(("localhost", port), QueryHandler, workers, bidirectional)
+
+
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, search from both ends at once
+    instead of running a single breadth-first search from `source`.
+
     If no possible path, returns None.
     """
+    if bidirectional:
+        return bidirectional_path(source, target)
+
+    # Search over integer indexes when the compact graph is loaded
+    if graph is not None:
+        path = graph.shortest_path(
+            graph.person_index[source], graph.person_index[target]
+        )
+        return None if path is None else graph.path_ids(path)
 
     # If node contains the state, here is solution
     def find_solution(node):
@@ -104,7 +1348,7 @@ def shortest_path(source, target):
 
 
     start = Node(state=source, parent=None, action=None)
-    frontier = QueueFrontier()
+    frontier = DequeFrontier()
     frontier.add(start)
     explored = set()
 
@@ -137,7 +1381,384 @@ def shortest_path(source, target):
             
             frontier.add(next)
 
-        
+
+
+def bidirectional_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching breadth-first
+    from both people and always expanding the smaller frontier.
+
+    If no possible path, returns None.
+    """
+    if graph is not None:
+        path = graph.bidirectional_path(
+            graph.person_index[source], graph.person_index[target]
+        )
+        return None if path is None else graph.path_ids(path)
+
+    if source == target:
+        return []
+
+    # Map each reached person to (movie_id, person_id) one step closer
+    # to the side's start, and to their distance from that start
+    parents = ({source: None}, {target: None})
+    depths = ({source: 0}, {target: 0})
+    frontiers = ([source], [target])
+
+    while frontiers[0] and frontiers[1]:
+
+        # Grow the side with fewer people waiting to be expanded
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other = 1 - side
+        next_frontier = []
+        best = None
+
+        # Expand one full layer so every meeting point is considered
+        for person_id in frontiers[side]:
+            depth = depths[side][person_id] + 1
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor in depths[side]:
+                    continue
+                parents[side][neighbor] = (movie_id, person_id)
+                depths[side][neighbor] = depth
+                next_frontier.append(neighbor)
+
+                if neighbor in depths[other]:
+                    length = depth + depths[other][neighbor]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor)
+
+        if best is not None:
+            return stitch_path(parents, best[1])
+
+        frontiers = (
+            (next_frontier, frontiers[1]) if side == 0
+            else (frontiers[0], next_frontier)
+        )
+
+    return None
+
+
+def stitch_path(parents, meeting):
+    """
+    Returns the (movie_id, person_id) path from source to target
+    through the person `meeting`, given the parent maps of a
+    forward and a backward search.
+    """
+    forward, backward = parents
+
+    # Walk back from the meeting point to the source
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, parent = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = parent
+    path.reverse()
+
+    # Walk on from the meeting point to the target
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, child = backward[person_id]
+        path.append((movie_id, child))
+        person_id = child
+
+    return path
+
+
+def all_shortest_paths(source, target):
+    """
+    Yield every distinct shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, one at a time.
+
+    The search keeps, for each person, every (movie_id, person_id) one
+    layer closer to the source. Paths are then walked out of that layer
+    DAG depth-first, so shared parts are never searched or stored twice.
+    """
+    if graph is not None:
+        paths = layered_paths(
+            graph.person_index[source], graph.person_index[target], graph.neighbors
+        )
+        return map(graph.path_ids, paths)
+    return layered_paths(source, target, neighbors_for_person)
+
+
+def layered_paths(source, target, neighbors):
+    """
+    Yield every distinct shortest path from `source` to `target` for
+    all_shortest_paths, where `neighbors` returns the (movie, person)
+    pairs next to a person.
+    """
+    if source == target:
+        yield []
+        return
+
+    # Breadth-first search, one full layer at a time, until the target
+    predecessors = {source: []}
+    layer = [source]
+    while layer and target not in predecessors:
+        added = {}
+        for person_id in layer:
+            for movie_id, neighbor in neighbors(person_id):
+                if neighbor not in predecessors:
+                    added.setdefault(neighbor, []).append((movie_id, person_id))
+        predecessors.update(added)
+        layer = list(added)
+
+    if target not in predecessors:
+        return
+
+    # Walk back from the target, keeping only the current path's steps
+    steps = []
+    stack = [(0, target, movie_id, parent) for movie_id, parent in predecessors[target]]
+    while stack:
+        depth, person_id, movie_id, parent = stack.pop()
+        del steps[depth:]
+        steps.append((movie_id, person_id))
+        if parent == source:
+            yield steps[::-1]
+        else:
+            stack.extend(
+                (depth + 1, parent, step_movie, step_parent)
+                for step_movie, step_parent in predecessors[parent]
+            )
+
+
+def k_shortest_paths(source, target, k=None):
+    """
+    Yield up to `k` (or all, if `k` is None) distinct loopless lists
+    of (movie_id, person_id) pairs that connect the source to the
+    target, shortest first, using Yen's algorithm.
+    """
+    if graph is not None:
+        paths = yen_paths(
+            graph.person_index[source], graph.person_index[target], k,
+            graph.shortest_path, graph.restricted_path
+        )
+        return map(graph.path_ids, paths)
+    return yen_paths(source, target, k, shortest_path, restricted_path)
+
+
+def yen_paths(source, target, k, shortest, restricted):
+    """
+    Yield paths for k_shortest_paths, using the `shortest` and
+    `restricted` searches (shortest_path and restricted_path, or their
+    CompactGraph counterparts).
+    """
+    first = shortest(source, target)
+    if first is None or k == 0:
+        return
+    found = [first]
+    yield first
+
+    candidates = []
+    seen = {tuple(first)}
+    counter = itertools.count()
+    while k is None or len(found) < k:
+        previous = found[-1]
+        people_on_path = [source] + [person_id for _, person_id in previous]
+
+        # Branch off the last path found at each of its people in turn
+        for i in range(len(previous)):
+            spur = people_on_path[i]
+            root = previous[:i]
+            blocked_steps = {
+                (path[i][0], path[i][1])
+                for path in found
+                if len(path) > i and path[:i] == root
+            }
+            blocked_people = set(people_on_path[:i])
+            spur_path = restricted(spur, target, blocked_people, blocked_steps)
+            if spur_path is None:
+                continue
+            path = root + spur_path
+            if tuple(path) not in seen:
+                seen.add(tuple(path))
+                heapq.heappush(candidates, (len(path), next(counter), path))
+
+        if not candidates:
+            return
+        path = heapq.heappop(candidates)[2]
+        found.append(path)
+        yield path
+
+
+def restricted_path(source, target, blocked_people, blocked_steps):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs that
+    connect the source to the target without visiting anyone in
+    `blocked_people` or taking any (movie_id, person_id) step in
+    `blocked_steps` straight out of the source.
+
+    If no possible path, returns None.
+    """
+    if graph is not None:
+        index = graph.person_index
+        path = graph.restricted_path(
+            index[source], index[target],
+            {index[person_id] for person_id in blocked_people},
+            {
+                (graph.movie_position(movie_id), index[person_id])
+                for movie_id, person_id in blocked_steps
+            },
+        )
+        return None if path is None else graph.path_ids(path)
+
+    if source == target:
+        return []
+    parents = {source: None}
+    frontier = deque([source])
+    while frontier:
+        person_id = frontier.popleft()
+        for step in neighbors_for_person(person_id):
+            movie_id, neighbor = step
+            if neighbor in parents or neighbor in blocked_people:
+                continue
+            if person_id == source and step in blocked_steps:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            if neighbor == target:
+                return path_from_parents(parents, target)
+            frontier.append(neighbor)
+    return None
+
+
+def single_source(source):
+    """
+    Run one breadth-first search from person `source`.
+
+    Return (distances, parents), where distances maps every reachable
+    person_id to their degrees from `source`, and parents maps them to
+    the (movie_id, person_id) pair one step closer to `source`
+    (None for `source` itself).
+    """
+    if graph is not None:
+        distances, parent_person, parent_movie = graph.single_source(
+            graph.person_index[source]
+        )
+        person_ids = graph.person_ids
+        movie_ids = graph.movie_ids
+        reached = [i for i, distance in enumerate(distances) if distance != -1]
+        return (
+            {person_ids[i]: distances[i] for i in reached},
+            {
+                person_ids[i]: (
+                    None if person_ids[i] == source
+                    else (movie_ids[parent_movie[i]], person_ids[parent_person[i]])
+                )
+                for i in reached
+            },
+        )
+
+    distances = {source: 0}
+    parents = {source: None}
+    frontier = deque([source])
+    while frontier:
+        person_id = frontier.popleft()
+        distance = distances[person_id] + 1
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor not in distances:
+                distances[neighbor] = distance
+                parents[neighbor] = (movie_id, person_id)
+                frontier.append(neighbor)
+    return distances, parents
+
+
+def path_from_parents(parents, target):
+    """
+    Returns the list of (movie_id, person_id) pairs that connect the
+    source of a single_source search to `target`, in O(path length).
+
+    If `target` was not reached, returns None.
+    """
+    if target not in parents:
+        return None
+    path = []
+    while parents[target] is not None:
+        movie_id, parent = parents[target]
+        path.append((movie_id, target))
+        target = parent
+    path.reverse()
+    return path
+
+
+class LandmarkIndex():
+    """
+    Breadth-first search trees from a chosen set of landmark people,
+    used to rebuild paths from any landmark and to bound the distance
+    between any two people without searching.
+    """
+
+    def __init__(self, trees=None):
+        """
+        Wrap a dictionary mapping landmark person_ids to their
+        (distances, parents) search trees.
+        """
+        self.trees = trees if trees is not None else {}
+
+    @classmethod
+    def build(cls, landmarks):
+        """
+        Run single_source from each person_id in `landmarks`.
+        """
+        return cls({landmark: single_source(landmark) for landmark in landmarks})
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load an index saved with `save`.
+        """
+        with open(filename, "rb") as f:
+            return cls(pickle.load(f))
+
+    def save(self, filename):
+        """
+        Write the search trees to `filename`.
+        """
+        with open(filename, "wb") as f:
+            pickle.dump(self.trees, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def distance(self, landmark, person_id):
+        """
+        Return the degrees between `landmark` and `person_id`,
+        or None if they are not connected.
+        """
+        return self.trees[landmark][0].get(person_id)
+
+    def path(self, landmark, person_id):
+        """
+        Return the shortest (movie_id, person_id) path from `landmark`
+        to `person_id`, or None if they are not connected.
+        """
+        return path_from_parents(self.trees[landmark][1], person_id)
+
+    def bounds(self, source, target):
+        """
+        Return (lower, upper) bounds on the degrees between `source` and
+        `target` from the triangle inequality over every landmark.
+
+        upper is None if no landmark reaches both people. If a landmark
+        reaches exactly one of them, they are not connected and the
+        result is (None, None).
+        """
+        if source == target:
+            return 0, 0
+        lower = 1
+        upper = None
+        for distances, _ in self.trees.values():
+            d_source = distances.get(source)
+            d_target = distances.get(target)
+            if d_source is None and d_target is None:
+                continue
+            if d_source is None or d_target is None:
+                return None, None
+            lower = max(lower, abs(d_source - d_target))
+            if upper is None or d_source + d_target < upper:
+                upper = d_source + d_target
+        return lower, upper
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -169,6 +1790,12 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {
+            (graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in graph.neighbors(graph.person_index[person_id])
+        }
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
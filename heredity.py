@@ -1,6 +1,16 @@
+import argparse
 import csv
 import itertools
+import json
+import os
+import signal
+import string
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError, as_completed
+from functools import reduce
+
+import numpy as np
 
 PROBS = {
 
@@ -36,53 +46,59 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Gene counts in the order used by the arrays of the inference engine
+GENES = (0, 1, 2)
 
-def main():
+# Assignments evaluated together by enumerate_probabilities
+BATCH_SIZE = 4096
 
-    # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+# Lookup tables compiled from PROBS, see compiled_tables
+factor_tables = None
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
-        person: {
-            "gene": {
-                2: 0,
-                1: 0,
-                0: 0
-            },
-            "trait": {
-                True: 0,
-                False: 0
-            }
-        }
-        for person in people
-    }
+# Engines the batch mode can run on each family
+ENGINES = {
+    "infer": lambda people: infer(people),
+    "enumerate": lambda people: enumerate_probabilities(people),
+    "stream": lambda people: stream_probabilities(people),
+}
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+# Default budget of the sampling engines, per chain
+SAMPLES = 2000
+BURN_IN = 200
+CHAINS = 4
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
 
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute gene and trait probabilities for a family."
+    )
+    parser.add_argument("data", help="family CSV, or with --batch a directory of them or a manifest")
+    parser.add_argument("--batch", action="store_true",
+                        help="run every family of a directory or manifest file in a process pool")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes running families in batch mode")
+    parser.add_argument("--timeout", type=float, default=60,
+                        help="seconds one family may take in batch mode")
+    parser.add_argument("--format", choices=["jsonl", "columnar"], default="jsonl",
+                        help="batch output: one JSON object per family, or one of columns")
+    parser.add_argument("--output", default="-",
+                        help="batch output file (- for stdout)")
+    parser.add_argument("--engine", choices=list(ENGINES), default="infer",
+                        help="inference engine")
+    args = parser.parse_args()
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    if args.batch:
+        families = family_files(args.data)
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        try:
+            run_batch(families, output, args.engine, args.workers, args.timeout, args.format)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        return
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+    people = load_data(args.data)
+    probabilities = ENGINES[args.engine](people)
 
     # Print results
     for person in people:
@@ -94,6 +110,322 @@ def main():
                 print(f"    {value}: {p:.4f}")
 
 
+def family_files(path):
+    """
+    Return the family CSV files to run in batch mode: every CSV file in
+    directory `path`, or each line of the manifest file `path`, relative
+    to the manifest's directory, skipping blank lines and # comments.
+    """
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, filename) for filename in os.listdir(path)
+            if filename.endswith(".csv")
+        )
+    files = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                files.append(os.path.join(os.path.dirname(path), line))
+    return files
+
+
+class FamilyTimeout(Exception):
+    pass
+
+
+def run_family(filename, engine="infer", timeout=None):
+    """
+    Return a batch result for the family in `filename`: its gene and
+    trait probabilities, or an error, and the seconds it took. The
+    family is stopped with an error after `timeout` seconds, on
+    platforms with SIGALRM (run_batch handles the others).
+    """
+    def expire(signum, frame):
+        raise FamilyTimeout()
+
+    start = time.perf_counter()
+    result = {"family": filename}
+    alarm = timeout and hasattr(signal, "SIGALRM")
+    if alarm:
+        signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        people = load_data(filename)
+        result["people"] = len(people)
+        result["probabilities"] = ENGINES[engine](people)
+    except FamilyTimeout:
+        result["error"] = f"timed out after {timeout} seconds"
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_batch(families, output, engine="infer", workers=None, timeout=None,
+              format="jsonl", log=None):
+    """
+    Run every family file in `families` in a pool of `workers`
+    processes and write the results to `output`, as one JSON object per
+    family as soon as it finishes, or as one object of columns (with one
+    row per person) at the end. Report families per second and the
+    slowest families to `log`. Return the list of results.
+
+    Without SIGALRM, workers cannot stop a family themselves, so each
+    family is waited on in turn for at most `timeout` seconds instead.
+    """
+    log = log or sys.stderr
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {
+            pool.submit(run_family, family, engine, timeout): family for family in families
+        }
+        if timeout and not hasattr(signal, "SIGALRM"):
+            finished = (wait_family(future, family, timeout) for future, family in futures.items())
+        else:
+            finished = (future.result() for future in as_completed(futures))
+        for result in finished:
+            results.append(result)
+            if format == "jsonl":
+                output.write(json.dumps(result) + "\n")
+                output.flush()
+    seconds = time.perf_counter() - start
+
+    if format == "columnar":
+        json.dump(columns(results), output)
+        output.write("\n")
+
+    failed = sum(1 for result in results if "error" in result)
+    rate = len(results) / seconds if seconds > 0 else float("inf")
+    print(f"{len(results)} families in {seconds:.2f}s ({rate:.1f} families/s), "
+          f"{failed} failed.", file=log)
+    for result in sorted(results, key=lambda result: -result["seconds"])[:5]:
+        print(f"  {result['seconds']:8.3f}s  {result['family']}", file=log)
+    return results
+
+
+def wait_family(future, family, timeout):
+    """
+    Return the result of a run_family `future`, or a timeout error for
+    `family` if it has not finished within `timeout` seconds.
+    """
+    start = time.perf_counter()
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()
+        return {
+            "family": family,
+            "error": f"timed out after {timeout} seconds",
+            "seconds": time.perf_counter() - start,
+        }
+
+
+def columns(results):
+    """
+    Return batch results as columns: per-person columns of family,
+    person, gene and trait probabilities, and per-family columns of
+    timing and errors.
+    """
+    table = {
+        "family": [], "person": [],
+        "gene_0": [], "gene_1": [], "gene_2": [], "trait": [],
+    }
+    families = {"family": [], "people": [], "seconds": [], "error": []}
+    for result in results:
+        families["family"].append(result["family"])
+        families["people"].append(result.get("people"))
+        families["seconds"].append(result["seconds"])
+        families["error"].append(result.get("error"))
+        for person, probabilities in result.get("probabilities", {}).items():
+            table["family"].append(result["family"])
+            table["person"].append(person)
+            for gene in GENES:
+                table[f"gene_{gene}"].append(probabilities["gene"][gene])
+            table["trait"].append(probabilities["trait"][True])
+    return {"people": table, "families": families}
+
+
+def enumerate_probabilities(people, batch_size=BATCH_SIZE):
+    """
+    Return gene and trait probabilities for each person by summing the
+    joint probability of every assignment of genes and traits.
+
+    This takes O(2^n * 3^n) joint probabilities for n people, so it is
+    only usable for small families; `infer` computes the same values.
+    Assignments consistent with the known traits are evaluated
+    `batch_size` at a time by `batch_joint_probability`.
+    """
+    pedigree = Pedigree(people)
+    size = len(pedigree.names)
+    unknown = np.flatnonzero(pedigree.traits < 0)
+    gene_assignments = len(GENES) ** size
+
+    # Sums of joint probabilities by person and gene count or trait
+    gene_mass = np.zeros((size, len(GENES)))
+    trait_mass = np.zeros((size, 2))
+    total = gene_assignments * 2 ** len(unknown)
+    for start in range(0, total, batch_size):
+        codes = np.arange(start, min(start + batch_size, total), dtype=np.int64)
+
+        # Low base-3 digits are gene counts, the rest unknown traits
+        genes = (codes[:, None] // len(GENES) ** np.arange(size)) % len(GENES)
+        traits = np.broadcast_to(pedigree.traits, genes.shape).copy()
+        bits = codes // gene_assignments
+        traits[:, unknown] = (bits[:, None] >> np.arange(len(unknown))) & 1
+
+        p = batch_joint_probability(pedigree, genes, traits)
+        for i, gene in enumerate(GENES):
+            gene_mass[:, i] += p @ (genes == gene)
+        trait_mass[:, 1] += p @ traits
+        trait_mass[:, 0] += p @ (1 - traits)
+
+    probabilities = {
+        person: {
+            "gene": {gene: float(gene_mass[i, GENES.index(gene)]) for gene in (2, 1, 0)},
+            "trait": {True: float(trait_mass[i, 1]), False: float(trait_mass[i, 0])},
+        }
+        for i, person in enumerate(pedigree.names)
+    }
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def submasks(mask):
+    """
+    Yield every subset of the bits of `mask` as an integer, from `mask`
+    itself down to 0, without building them all first.
+    """
+    subset = mask
+    while True:
+        yield subset
+        if subset == 0:
+            return
+        subset = (subset - 1) & mask
+
+
+def stream_probabilities(people):
+    """
+    Return gene and trait probabilities for each person by enumerating
+    assignments lazily, with sets of people as bitmasks: bit i stands
+    for the i-th person of `people`.
+
+    Trait assignments only vary the people whose trait is unknown, so
+    none that contradict the evidence are generated. The gene factor of
+    each person only depends on their own and their parents' gene counts,
+    so it is looked up from a table built once, and the product over
+    people for a gene assignment is shared by all its trait assignments.
+    """
+    names = list(people)
+    size = len(names)
+    index = {name: i for i, name in enumerate(names)}
+    everyone = (1 << size) - 1
+    known_true = sum(1 << i for i, name in enumerate(names) if people[name]["trait"] is True)
+    unknown = [i for i, name in enumerate(names) if people[name]["trait"] is None]
+    unknown_mask = sum(1 << i for i in unknown)
+
+    # Factor of each person's gene count by (mother's, father's, own)
+    tables = compiled_tables()
+    inheritance = tables.inheritance.tolist()
+    parents = [
+        None if people[name]["mother"] is None else
+        (index[people[name]["mother"]], index[people[name]["father"]])
+        for name in names
+    ]
+    trait_probs = tables.trait.tolist()
+    prior = tables.prior.tolist()
+
+    gene_mass = [[0.0] * len(GENES) for _ in names]
+    trait_mass = [[0.0, 0.0] for _ in names]
+    for two_genes in submasks(everyone):
+        for one_gene in submasks(everyone & ~two_genes):
+            genes = [
+                2 if two_genes >> i & 1 else 1 if one_gene >> i & 1 else 0
+                for i in range(size)
+            ]
+            p_genes = 1.0
+            for i, gene in enumerate(genes):
+                if parents[i] is None:
+                    p_genes *= prior[gene]
+                else:
+                    p_genes *= inheritance[genes[parents[i][0]]][genes[parents[i][1]]][gene]
+            if p_genes == 0:
+                continue
+
+            # Trait factors of known traits are the same for every
+            # trait assignment of this gene assignment
+            for i, name in enumerate(names):
+                if people[name]["trait"] is not None:
+                    p_genes *= trait_probs[genes[i]][known_true >> i & 1]
+            total = 0.0
+            for varied in submasks(unknown_mask):
+                p = p_genes
+                for i in unknown:
+                    p *= trait_probs[genes[i]][varied >> i & 1]
+                have_trait = known_true | varied
+                for i in range(size):
+                    trait_mass[i][have_trait >> i & 1] += p
+                total += p
+            for i in range(size):
+                gene_mass[i][genes[i]] += total
+
+    probabilities = {
+        name: {
+            "gene": {gene: gene_mass[i][GENES.index(gene)] for gene in (2, 1, 0)},
+            "trait": {True: trait_mass[i][1], False: trait_mass[i][0]},
+        }
+        for i, name in enumerate(names)
+    }
+    normalize(probabilities)
+    return probabilities
+
+
+class Pedigree():
+    """
+    People of a family encoded as arrays for `batch_joint_probability`:
+    person i is `names[i]`, their parents are `mother[i]` and
+    `father[i]` (0 for people without parents, masked by `founders`),
+    and `traits[i]` is 1 or 0 if their trait is known and -1 if not.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        index = {name: i for i, name in enumerate(self.names)}
+        self.founders = np.array([people[name]["mother"] is None for name in self.names])
+        self.mother = np.array([index.get(people[name]["mother"], 0) for name in self.names])
+        self.father = np.array([index.get(people[name]["father"], 0) for name in self.names])
+        self.traits = np.array([
+            -1 if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in self.names
+        ])
+
+        # Lookup tables from PROBS, indexed by gene count (and trait)
+        tables = compiled_tables()
+        self.prior = tables.prior
+        self.inheritance = tables.inheritance
+        self.trait_table = tables.trait
+
+
+def batch_joint_probability(pedigree, genes, traits):
+    """
+    Return the joint probability of each of a batch of assignments, as
+    `joint_probability` computes it for one. `genes` and `traits` are
+    integer arrays with one row per assignment and one column per
+    person of `pedigree`, holding gene counts and 0 or 1 for the trait.
+    """
+    inherited = pedigree.inheritance[
+        genes[:, pedigree.mother], genes[:, pedigree.father], genes
+    ]
+    gene_prob = np.where(pedigree.founders, pedigree.prior[genes], inherited)
+    return (gene_prob * pedigree.trait_table[genes, traits]).prod(axis=1)
+
+
 def load_data(filename):
     """
     Load gene and trait data from a file into a dictionary.
@@ -139,60 +471,27 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
+    tables = compiled_tables()
     prob = 1
 
     for person in people:
         genes_num = 1 if person in one_gene else 2 if person in two_genes else 0
         trait = True if person in have_trait else False
 
-        trait_prob = PROBS['trait'][genes_num][trait]
-        gene_prob = PROBS["gene"][genes_num]
-
         # No parents listed in the data set, use the probability distribution
-        if people[person]["mother"] == None:
-            prob *= trait_prob * gene_prob
+        mother = people[person]["mother"]
+        if mother == None:
+            prob *= tables.founder[genes_num][trait]
         else:
-            # Get information parents
-            mother = people[person]["mother"]
+            # Look up the factor by the genes of both parents
             father = people[person]["father"]
-            parents = {}
-            
-            for parent in [mother, father]:
-                genes_num_parent = 1 if parent in one_gene else 2 if parent in two_genes else 0
-                gene_prob_parent = genes_num_parent / 2
-                parents[parent] = gene_prob_parent
-
-            # Probability of mutation gene
-            muta_prob = PROBS["mutation"]
-            
-            # Doesn't get gene from parents
-            if genes_num == 0:
-                not_mother = parents[mother] * muta_prob + (1 - parents[mother]) * (1 - muta_prob)
-                not_father = parents[father] * muta_prob + (1 - parents[father]) * (1 - muta_prob)
-                prob_no_parent = not_mother * not_father
-                
-                prob *= trait_prob * prob_no_parent
-
-            # Get one gene from mother or father
-            if genes_num == 1:
-                not_mother = parents[mother] * muta_prob + (1 - parents[mother]) * (1 - muta_prob)
-                not_father = parents[father] * muta_prob + (1 - parents[father]) * (1 - muta_prob)
-                get_mother = parents[mother] * (1 - muta_prob) + (1 - parents[mother]) * muta_prob 
-                get_father = parents[father] * (1 - muta_prob) + (1 - parents[father]) * muta_prob
-                prob_one_parent = not_mother * get_father + get_mother * not_father
-                
-                prob = trait_prob * prob_one_parent
-
-            # Get two genes from parents
-            if genes_num == 2:
-                get_mother = parents[mother] * (1 - muta_prob) + (1 - parents[mother]) * muta_prob 
-                get_father = parents[father] * (1 - muta_prob) + (1 - parents[father]) * muta_prob
-                prob_two_parents = get_father * get_mother
-
-                prob = trait_prob * prob_two_parents
+            genes_mother = 1 if mother in one_gene else 2 if mother in two_genes else 0
+            genes_father = 1 if father in one_gene else 2 if father in two_genes else 0
+            prob *= tables.child[genes_mother][genes_father][genes_num][trait]
 
     return prob
 
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -225,5 +524,680 @@ def normalize(probabilities):
         for j in trait:
             trait[j] /= sum_trait 
 
+class Factor():
+    """
+    Table of non-negative values over the gene counts of some people,
+    with one axis of length 3 per person in `variables`.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = np.asarray(table, dtype=float)
+
+    def __mul__(self, other):
+        """
+        Return the product of two factors, over the union of their people.
+        """
+        variables = self.variables + tuple(
+            variable for variable in other.variables if variable not in self.variables
+        )
+        letters = dict(zip(variables, string.ascii_letters))
+        subscripts = "{},{}->{}".format(
+            "".join(letters[variable] for variable in self.variables),
+            "".join(letters[variable] for variable in other.variables),
+            "".join(letters[variable] for variable in variables)
+        )
+        return Factor(variables, np.einsum(subscripts, self.table, other.table))
+
+    def keep(self, variables):
+        """
+        Return this factor summed over every person not in `variables`,
+        with its axes in the order of `variables`.
+        """
+        variables = tuple(variables)
+        summed = tuple(
+            axis for axis, variable in enumerate(self.variables) if variable not in variables
+        )
+        table = self.table.sum(axis=summed)
+        remaining = [variable for variable in self.variables if variable in variables]
+        table = np.transpose(table, [remaining.index(variable) for variable in variables])
+
+        # Only ratios matter, so rescale to keep long products in range
+        total = table.sum()
+        return Factor(variables, table / total if total > 0 else table)
+
+
+def probs_fingerprint():
+    """
+    Return a hashable snapshot of every value in PROBS, which changes
+    whenever any probability in it does.
+    """
+    gene = PROBS["gene"]
+    trait = PROBS["trait"]
+    return (
+        gene[0], gene[1], gene[2],
+        trait[0][True], trait[0][False], trait[1][True], trait[1][False],
+        trait[2][True], trait[2][False],
+        PROBS["mutation"],
+    )
+
+
+class FactorTables():
+    """
+    PROBS compiled into lookup tables indexed by gene count, so a
+    person's factor is a lookup rather than arithmetic on PROBS:
+
+        founder[gene][trait]                probability for a person
+                                            without parents listed
+        child[mother][father][gene][trait]  probability for a child given
+                                            the gene counts of the parents
+
+    `prior`, `trait` (gene x trait) and `inheritance` (mother x father x
+    child gene) hold the same probabilities as read-only NumPy arrays.
+    """
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.prior = np.array([PROBS["gene"][gene] for gene in GENES])
+        self.trait = np.array([
+            [PROBS["trait"][gene][False], PROBS["trait"][gene][True]] for gene in GENES
+        ])
+
+        # Chance each parent passes the gene on, after mutation
+        mutation = PROBS["mutation"]
+        passes = np.array([mutation, 0.5, 1 - mutation])
+        mother = passes[:, None]
+        father = passes[None, :]
+        self.inheritance = np.stack([
+            (1 - mother) * (1 - father),
+            mother * (1 - father) + (1 - mother) * father,
+            mother * father,
+        ], axis=-1)
+        for table in (self.prior, self.trait, self.inheritance):
+            table.setflags(write=False)
+
+        self.founder = (self.prior[:, None] * self.trait).tolist()
+        self.child = (self.inheritance[..., None] * self.trait).tolist()
+
+
+def compiled_tables():
+    """
+    Return the FactorTables for the current PROBS, compiling them again
+    only if PROBS has changed since they were last compiled.
+    """
+    global factor_tables
+    fingerprint = probs_fingerprint()
+    if factor_tables is None or factor_tables.fingerprint != fingerprint:
+        factor_tables = FactorTables(fingerprint)
+    return factor_tables
+
+
+def inheritance_table():
+    """
+    Return a 3x3x3 array of the probability of a child's gene count
+    given the gene counts of the mother and father, in that axis order.
+    """
+    return compiled_tables().inheritance
+
+
+def evidence(person):
+    """
+    Return the probability of a person's known trait for each gene
+    count, or all ones if their trait is unknown.
+    """
+    if person["trait"] is None:
+        return np.ones(len(GENES))
+    return np.array([PROBS["trait"][gene][person["trait"]] for gene in GENES])
+
+
+def person_factor(people, name):
+    """
+    Return the factor of one person of the pedigree as a Bayesian
+    network over gene counts: the probability of their gene count given
+    their parents', times that of their known trait, if any.
+    """
+    person = people[name]
+    if person["mother"] is None:
+        return Factor([name], compiled_tables().prior * evidence(person))
+    return Factor(
+        [person["mother"], person["father"], name],
+        inheritance_table() * evidence(person)
+    )
+
+
+def elimination_order(factors):
+    """
+    Return an order to eliminate the people in `factors` that greedily
+    adds the fewest edges between the remaining people at each step.
+    """
+    neighbors = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors.setdefault(variable, set()).update(factor.variables)
+            neighbors[variable].discard(variable)
+
+    def fill(variable):
+        adjacent = list(neighbors[variable])
+        missing = sum(
+            1 for a, b in itertools.combinations(adjacent, 2) if b not in neighbors[a]
+        )
+        return (missing, len(adjacent))
+
+    scores = {variable: fill(variable) for variable in neighbors}
+    order = []
+    while scores:
+        variable = min(scores, key=scores.get)
+        order.append(variable)
+        adjacent = neighbors.pop(variable)
+        del scores[variable]
+
+        # Eliminating a person connects all of their neighbors
+        for a in adjacent:
+            neighbors[a].discard(variable)
+            neighbors[a].update(adjacent - {a})
+        for a in adjacent:
+            scores[a] = fill(a)
+            for b in neighbors[a]:
+                scores[b] = fill(b)
+    return order
+
+
+def gene_marginals(people):
+    """
+    Return a dictionary mapping each person to an array of the
+    probabilities of their gene counts, given the known traits.
+    """
+    return InferenceSession(people).gene_marginals()
+
+
+def infer(people):
+    """
+    Return gene and trait probabilities for each person, in the same
+    form as `enumerate_probabilities`, by exact inference over the
+    pedigree with an InferenceSession.
+    """
+    return InferenceSession(people).probabilities()
+
+
+class InferenceSession():
+    """
+    Exact inference over one pedigree that keeps its work between
+    queries, so traits can be observed one at a time.
+
+    Eliminating the people one at a time builds a junction tree with one
+    cluster per person, and messages passed up and down the tree give
+    every marginal. The cost grows with the size of the largest cluster
+    (the treewidth of the pedigree) rather than with the number of people.
+
+    The tree does not depend on the evidence, so `observe` only drops
+    the messages an observation changes: those up from the person's
+    cluster to its root, and those down into the rest of its tree.
+    Messages are computed again when a query needs them.
+    """
+
+    def __init__(self, people):
+        self.people = {name: dict(person) for name, person in people.items()}
+        self.factors = {name: person_factor(self.people, name) for name in self.people}
+        self.clusters = []
+        self.owner = {}
+        self.cluster_of = {}
+
+        # Eliminating a person makes a cluster of everyone in the
+        # factors and messages that mention them
+        pool = [(self.factors[name], None, name) for name in self.people]
+        for variable in elimination_order(list(self.factors.values())):
+            taken = [item for item in pool if variable in item[0].variables]
+            pool = [item for item in pool if variable not in item[0].variables]
+            variables = reduce(
+                lambda union, factor: union + tuple(
+                    v for v in factor.variables if v not in union
+                ),
+                (factor for factor, _, _ in taken), ()
+            )
+            index = len(self.clusters)
+            self.clusters.append({
+                "variable": variable,
+                "variables": variables,
+                "separator": tuple(v for v in variables if v != variable),
+                "owned": [name for _, source, name in taken if source is None],
+                "children": [source for _, source, _ in taken if source is not None],
+                "parent": None,
+            })
+            self.cluster_of[variable] = index
+            for name in self.clusters[index]["owned"]:
+                self.owner[name] = index
+            for child in self.clusters[index]["children"]:
+                self.clusters[child]["parent"] = index
+
+            # Only a placeholder with the right scope is needed here
+            separator = self.clusters[index]["separator"]
+            if separator:
+                pool.append((Factor(separator, np.ones((len(GENES),) * len(separator))),
+                             index, None))
+
+        # Clusters of each tree of the forest, one per connected family
+        self.root = [None] * len(self.clusters)
+        self.members = {}
+        for index in reversed(range(len(self.clusters))):
+            parent = self.clusters[index]["parent"]
+            self.root[index] = index if parent is None else self.root[parent]
+            self.members.setdefault(self.root[index], []).append(index)
+
+        self.potentials = [None] * len(self.clusters)
+        self.up = [None] * len(self.clusters)
+        self.down = [None] * len(self.clusters)
+
+    def observe(self, person, trait):
+        """
+        Record that `person` has (True), does not have (False) or has an
+        unknown (None) trait, dropping only the messages it changes.
+        """
+        if person not in self.people:
+            raise KeyError(person)
+        if self.people[person]["trait"] == trait:
+            return
+        self.people[person]["trait"] = trait
+        self.factors[person] = person_factor(self.people, person)
+
+        index = self.owner[person]
+        self.potentials[index] = None
+        while index is not None:
+            self.up[index] = None
+            index = self.clusters[index]["parent"]
+        for index in self.members[self.root[self.owner[person]]]:
+            self.down[index] = None
+
+    def potential(self, index):
+        """
+        Return the product of the factors assigned to cluster `index`.
+        """
+        if self.potentials[index] is None:
+            variables = self.clusters[index]["variables"]
+            self.potentials[index] = reduce(
+                lambda product, name: product * self.factors[name],
+                self.clusters[index]["owned"],
+                Factor(variables, np.ones((len(GENES),) * len(variables)))
+            )
+        return self.potentials[index]
+
+    def message_up(self, index):
+        """
+        Return the message from cluster `index` to its parent, computing
+        any missing messages below it first.
+        """
+        if self.up[index] is None:
+            # Children were eliminated first, so they have lower indices
+            stack = [index]
+            missing = []
+            while stack:
+                i = stack.pop()
+                missing.append(i)
+                stack.extend(c for c in self.clusters[i]["children"] if self.up[c] is None)
+            for i in sorted(missing):
+                belief = reduce(
+                    lambda product, child: product * self.up[child],
+                    self.clusters[i]["children"], self.potential(i)
+                )
+                self.up[i] = belief.keep(self.clusters[i]["separator"])
+        return self.up[index]
+
+    def message_down(self, index):
+        """
+        Return the message into cluster `index` from its parent, or None
+        for a root, computing any missing messages above it first.
+        """
+        path = []
+        i = index
+        while self.clusters[i]["parent"] is not None and self.down[i] is None:
+            path.append(i)
+            i = self.clusters[i]["parent"]
+
+        # Parents were eliminated after their children, so go top down
+        for i in reversed(path):
+            parent = self.clusters[i]["parent"]
+            incoming = [
+                self.message_up(child) for child in self.clusters[parent]["children"]
+                if child != i
+            ]
+            if self.clusters[parent]["parent"] is not None:
+                incoming.append(self.down[parent])
+            message = reduce(lambda product, factor: product * factor,
+                             incoming, self.potential(parent))
+            self.down[i] = message.keep(self.clusters[i]["separator"])
+        return self.down[index]
+
+    def gene_distribution(self, person):
+        """
+        Return an array of the probabilities of the gene counts of
+        `person`, given the traits observed so far.
+        """
+        index = self.cluster_of[person]
+        incoming = [self.message_up(child) for child in self.clusters[index]["children"]]
+        down = self.message_down(index)
+        if down is not None:
+            incoming.append(down)
+        belief = reduce(lambda product, factor: product * factor,
+                        incoming, self.potential(index))
+        return belief.keep([person]).table
+
+    def gene_marginals(self):
+        """
+        Return a dictionary mapping each person to the array of
+        probabilities of their gene counts.
+        """
+        return {person: self.gene_distribution(person) for person in self.people}
+
+    def probability(self, person):
+        """
+        Return the gene and trait probabilities of `person`, in the form
+        of one entry of `enumerate_probabilities`.
+        """
+        genes = self.gene_distribution(person)
+        trait = self.people[person]["trait"]
+        if trait is None:
+            has_trait = float(genes @ compiled_tables().trait[:, 1])
+        else:
+            has_trait = 1.0 if trait else 0.0
+        return {
+            "gene": {gene: float(genes[GENES.index(gene)]) for gene in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait},
+        }
+
+    def probabilities(self):
+        """
+        Return gene and trait probabilities for every person.
+        """
+        return {person: self.probability(person) for person in self.people}
+
+
+def topological_order(pedigree):
+    """
+    Return the indices of the people of `pedigree` with every parent
+    before their children.
+    """
+    order = []
+    placed = set()
+
+    def place(i):
+        stack = [i]
+        while stack:
+            i = stack[-1]
+            parents = [] if pedigree.founders[i] else [
+                parent for parent in (pedigree.mother[i], pedigree.father[i])
+                if parent not in placed
+            ]
+            if parents:
+                stack.extend(parents)
+            else:
+                stack.pop()
+                if i not in placed:
+                    placed.add(i)
+                    order.append(i)
+
+    for i in range(len(pedigree.names)):
+        place(i)
+    return order
+
+
+def likelihood_chain(people, samples, seed):
+    """
+    Return (genes, weights) for `samples` samples of likelihood
+    weighting: every gene count is drawn from PROBS given the parents'
+    draws, and each sample is weighted by the probability of the known
+    traits. `genes` has one row per sample and one column per person.
+    """
+    pedigree = Pedigree(people)
+    rng = np.random.default_rng(seed)
+    genes = np.zeros((samples, len(pedigree.names)), dtype=np.int64)
+    weights = np.ones(samples)
+    for i in topological_order(pedigree):
+        if pedigree.founders[i]:
+            distribution = np.broadcast_to(pedigree.prior, (samples, len(GENES)))
+        else:
+            distribution = pedigree.inheritance[
+                genes[:, pedigree.mother[i]], genes[:, pedigree.father[i]]
+            ]
+
+        # Invert the cumulative distribution of each sample's row
+        draws = rng.random((samples, 1))
+        genes[:, i] = np.minimum((draws > distribution.cumsum(axis=1)).sum(axis=1),
+                                 len(GENES) - 1)
+        if pedigree.traits[i] >= 0:
+            weights *= pedigree.trait_table[genes[:, i], pedigree.traits[i]]
+    return genes, weights
+
+
+def gibbs_blocks(pedigree):
+    """
+    Return blocks of people that the Gibbs sampler draws together: the
+    two parents of a family are one block, since their genes are
+    strongly tied by their children, and everyone else is on their own.
+    """
+    blocks = []
+    blocked = set()
+    for i in range(len(pedigree.names)):
+        if pedigree.founders[i]:
+            continue
+        couple = (int(pedigree.mother[i]), int(pedigree.father[i]))
+        if not blocked.intersection(couple):
+            blocks.append(couple)
+            blocked.update(couple)
+    blocks.extend((i,) for i in range(len(pedigree.names)) if i not in blocked)
+    return blocks
+
+
+def gibbs_chain(people, samples, seed, burn_in=BURN_IN):
+    """
+    Return (genes, weights) for `samples` sweeps of a blocked Gibbs
+    sampler after `burn_in` sweeps, with all weights 1. Each step
+    draws a block of gene counts from its distribution given everyone
+    else's current gene counts and the known traits.
+    """
+    pedigree = Pedigree(people)
+    rng = np.random.default_rng(seed)
+    size = len(pedigree.names)
+    children = [[] for _ in range(size)]
+    for i in range(size):
+        if not pedigree.founders[i]:
+            children[pedigree.mother[i]].append(i)
+            if pedigree.father[i] != pedigree.mother[i]:
+                children[pedigree.father[i]].append(i)
+
+    # Give every person a table over (mother, father, own) gene counts,
+    # with the known trait folded in; founders ignore the parent axes
+    tables = np.empty((size, len(GENES), len(GENES), len(GENES)))
+    mother = pedigree.mother.copy()
+    father = pedigree.father.copy()
+    for i in range(size):
+        if pedigree.founders[i]:
+            tables[i] = pedigree.prior
+            mother[i] = father[i] = i
+        else:
+            tables[i] = pedigree.inheritance
+        if pedigree.traits[i] >= 0:
+            tables[i] *= pedigree.trait_table[:, pedigree.traits[i]]
+
+    # Each block's joint values, and the people whose factors involve it
+    blocks = []
+    for block in gibbs_blocks(pedigree):
+        values = np.array(list(itertools.product(GENES, repeat=len(block))))
+        touched = np.array(sorted(set(block).union(*(children[i] for i in block))))
+        blocks.append((list(block), values, touched, mother[touched], father[touched]))
+
+    state = likelihood_chain(people, 1, rng)[0][0]
+    recorded = np.zeros((samples, size), dtype=np.int64)
+    for sweep in range(burn_in + samples):
+        for block, values, touched, mothers, fathers in blocks:
+            proposal = np.repeat(state[None, :], len(values), axis=0)
+            proposal[:, block] = values
+            weight = tables[
+                touched, proposal[:, mothers], proposal[:, fathers], proposal[:, touched]
+            ].prod(axis=1).cumsum()
+            choice = np.searchsorted(weight, rng.random() * weight[-1], side="right")
+            state[block] = values[min(choice, len(values) - 1)]
+        if sweep >= burn_in:
+            recorded[sweep - burn_in] = state
+    return recorded, np.ones(samples)
+
+
+# Sampling engines by name for sample_probabilities
+SAMPLERS = {
+    "likelihood": likelihood_chain,
+    "gibbs": gibbs_chain,
+}
+
+
+def sample_probabilities(people, method="gibbs", samples=SAMPLES, chains=CHAINS,
+                         workers=None, seed=None):
+    """
+    Return (probabilities, diagnostics) estimated by `chains`
+    independent runs of the sampler `method`, one of SAMPLERS, each
+    taking `samples` samples. Chains run in a pool of `workers`
+    processes, or in this process if `workers` is 1. `seed` makes the
+    result reproducible.
+
+    `probabilities` has the form `enumerate_probabilities` returns, with
+    traits averaged over the sampled gene counts. `diagnostics` holds
+    the effective sample size and, for more than one chain, the largest
+    R-hat over all gene probabilities, as `sampling_diagnostics` returns.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"unknown sampler {method!r}, expected one of {', '.join(SAMPLERS)}")
+    seeds = np.random.SeedSequence(seed).spawn(chains)
+    arguments = ([people] * chains, [samples] * chains, seeds)
+    if workers == 1:
+        runs = list(map(SAMPLERS[method], *arguments))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            runs = list(pool.map(SAMPLERS[method], *arguments))
+
+    pedigree = Pedigree(people)
+    genes = np.concatenate([run[0] for run in runs])
+    weights = np.concatenate([run[1] for run in runs])
+    if not weights.sum() > 0:
+        raise ValueError("no sample is consistent with the known traits")
+    weights = weights / weights.sum()
+    gene_mass = np.stack([weights @ (genes == gene) for gene in GENES], axis=1)
+    has_trait = gene_mass @ pedigree.trait_table[:, 1]
+    known = pedigree.traits >= 0
+    has_trait[known] = pedigree.traits[known]
+
+    probabilities = {
+        person: {
+            "gene": {gene: float(gene_mass[i, GENES.index(gene)]) for gene in (2, 1, 0)},
+            "trait": {True: float(has_trait[i]), False: float(1 - has_trait[i])},
+        }
+        for i, person in enumerate(pedigree.names)
+    }
+    diagnostics = sampling_diagnostics(runs, method)
+    return probabilities, diagnostics
+
+
+def sampling_diagnostics(runs, method):
+    """
+    Return a dictionary of convergence diagnostics for the (genes,
+    weights) runs of one sampler: the effective sample size "ess", and
+    the largest potential scale reduction "rhat" over every person and
+    gene count when there are several chains.
+
+    Likelihood weighting draws independent samples, so its effective
+    size comes from the spread of the weights alone, and its R-hat
+    compares the weighted estimates of the chains. Gibbs samples are
+    correlated, so their effective size comes from the autocorrelation
+    of each chain.
+    """
+    samples = sum(len(genes) for genes, _ in runs)
+
+    # One series per chain for each person and gene count
+    series = np.stack([
+        np.stack([genes == gene for gene in GENES], axis=-1).reshape(len(genes), -1)
+        for genes, _ in runs
+    ]).astype(float)
+    if method == "likelihood":
+        return weighted_diagnostics(series, np.stack([weights for _, weights in runs]))
+
+    chains, length, _ = series.shape
+    means = series.mean(axis=1)
+    within = series.var(axis=1, ddof=1).mean(axis=0) if length > 1 else np.zeros(series.shape[2])
+    between = length * means.var(axis=0, ddof=1) if chains > 1 else np.zeros(series.shape[2])
+    variance = (length - 1) / length * within + between / length
+
+    # Constant series (a gene count never or always seen) tell nothing
+    varying = within > 0
+    diagnostics = {"samples": samples, "ess": float(samples)}
+    if chains > 1 and varying.any():
+        rhat = np.sqrt(variance[varying] / within[varying])
+        diagnostics["rhat"] = float(rhat.max())
+    if varying.any():
+        diagnostics["ess"] = float(effective_sample_size(series[:, :, varying]).min())
+    return diagnostics
+
+
+def weighted_diagnostics(series, weights):
+    """
+    Return the diagnostics of `sampling_diagnostics` for likelihood
+    weighting, from `series` of (chains, samples, columns) and the
+    (chains, samples) weights.
+
+    Each chain's estimate is its self-normalized weighted mean. Chains
+    whose weight is all on a few samples barely vary within themselves
+    while disagreeing with each other, so R-hat grows without bound as
+    the effective sample size collapses.
+    """
+    total = weights.sum()
+    ess = total ** 2 / (weights ** 2).sum() if total > 0 else 0.0
+    diagnostics = {"samples": weights.size, "ess": float(ess)}
+
+    # Chains without a consistent sample have no estimate to compare
+    sums = weights.sum(axis=1)
+    used = sums > 0
+    if used.sum() < 2:
+        return diagnostics
+    normalized = weights[used] / sums[used, None]
+    means = np.einsum("cs,csk->ck", normalized, series[used])
+    within = np.einsum(
+        "cs,csk->ck", normalized, (series[used] - means[:, None, :]) ** 2
+    ).mean(axis=0)
+    variance = within + means.var(axis=0, ddof=1)
+
+    # Columns that are constant in every chain tell nothing
+    varying = variance > 0
+    if varying.any():
+        with np.errstate(divide="ignore"):
+            rhat = np.sqrt(variance[varying] / within[varying])
+        diagnostics["rhat"] = float(rhat.max())
+    return diagnostics
+
+
+def effective_sample_size(series):
+    """
+    Return the effective sample size of each column of `series`, an
+    array of (chains, samples, columns), from the autocorrelations
+    averaged over chains, summed up to the first negative pair of lags
+    (Geyer's initial positive sequence).
+    """
+    chains, length, columns = series.shape
+    centered = series - series.mean(axis=1, keepdims=True)
+
+    # Autocovariance of every lag at once through the FFT
+    padded = 2 ** int(np.ceil(np.log2(2 * length)))
+    spectrum = np.fft.rfft(centered, n=padded, axis=1)
+    autocovariance = np.fft.irfft(spectrum * np.conj(spectrum), n=padded, axis=1)[:, :length]
+    autocovariance = autocovariance.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rho = autocovariance / autocovariance[0]
+
+    ess = np.empty(columns)
+    for column in range(columns):
+        total = 0.0
+        for lag in range(1, length - 1, 2):
+            pair = rho[lag, column] + rho[lag + 1, column]
+            if not pair > 0:
+                break
+            total += pair
+        ess[column] = chains * length / (1 + 2 * total)
+    return ess
+
+
 if __name__ == "__main__":
     main()
@@ -1,11 +1,61 @@
+import heapq
+import itertools
+import json
+import math
+import mmap
 import os
 import random
 import re
 import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+# Only needed for memory in traces, and missing on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Convergence settings for the iterative engines
+TOLERANCE = 0.001
+MAX_ITERATIONS = 1000
+
+# Link pattern used by `crawl`, over bytes so it can scan memory maps
+LINK_PATTERN = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Pages at least this many bytes are memory-mapped instead of read
+MMAP_THRESHOLD = 1 << 20
+
+# Link cache written into the corpus directory by parallel_crawl
+CRAWL_CACHE = ".crawl-cache.json"
+
+# Number of seed sets PersonalizedPageRank remembers results for
+PERSONALIZED_CACHE = 128
+
+# Iterations between extrapolations in the extrapolating solvers
+EXTRAPOLATION_PERIOD = 10
+
+# Adaptive solver freezes pages that change by less than this
+# fraction of the tolerance
+FREEZE_FRACTION = 0.1
+
+# Links and pages per block when streaming an EdgeFile from disk, and
+# the number of target ranges links are bucketed by while sorting
+EDGE_BLOCK = 1 << 20
+PAGE_BLOCK = 1 << 20
+EDGE_BUCKETS = 64
+
+# Batches sample_pagerank splits samples into to estimate its error
+BATCHES = 20
+CONFIDENCE = 0.95
+
 
 def main():
     if len(sys.argv) != 2:
@@ -48,6 +98,143 @@ def crawl(directory):
     return pages
 
 
+def parallel_crawl(directory, workers=None, processes=False, cache=True):
+    """
+    Parse a directory of HTML pages like `crawl`, reading and parsing
+    pages in a pool of `workers` threads (or processes, if `processes`
+    is true).
+
+    Unless `cache` is false, the links of each page are kept in a cache
+    file in `directory` (or at the path `cache`), keyed by each file's
+    modification time and size, and only new or changed pages are
+    parsed again.
+    """
+    # Find every page and what its file looks like now
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.endswith(".html") and entry.is_file():
+                stat = entry.stat()
+                files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+
+    cache_path = None
+    cached = {}
+    if cache:
+        cache_path = cache if isinstance(cache, str) else os.path.join(directory, CRAWL_CACHE)
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (FileNotFoundError, ValueError):
+            cached = {}
+
+    # Reuse cached links for pages whose file has not changed
+    links = {}
+    changed = []
+    for filename, signature in files.items():
+        entry = cached.get(filename)
+        if entry is not None and entry[:2] == signature:
+            links[filename] = entry[2]
+        else:
+            changed.append(filename)
+
+    if changed:
+        pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with pool(max_workers=workers) as executor:
+            paths = [os.path.join(directory, filename) for filename in changed]
+            for filename, page_links in zip(changed, executor.map(extract_links, paths, chunksize=64)):
+                links[filename] = sorted(page_links)
+
+    if cache_path is not None and (changed or len(cached) != len(files)):
+        with open(f"{cache_path}.tmp", "w") as f:
+            json.dump({
+                filename: files[filename] + [links[filename]] for filename in files
+            }, f)
+        os.replace(f"{cache_path}.tmp", cache_path)
+
+    # Only include links to other pages in the corpus
+    return {
+        filename: set(link for link in links[filename] if link in files) - {filename}
+        for filename in files
+    }
+
+
+def extract_links(path):
+    """
+    Return the set of pages linked to by the HTML file at `path`,
+    scanning a memory map of the file if it is large.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as contents:
+                return {
+                    match.group(1).decode("utf-8", "replace")
+                    for match in LINK_PATTERN.finditer(contents)
+                }
+        contents = f.read()
+    return {
+        match.decode("utf-8", "replace") for match in LINK_PATTERN.findall(contents)
+    }
+
+
+class Tracer():
+    """
+    Progress records from a PageRank engine, passed to `callback` and
+    written to `trace` as one JSON object per line. Every record gets
+    the seconds since the start and since the last record, and the peak
+    resident memory so far, or None where the platform cannot report it.
+    """
+
+    def __init__(self, callback=None, trace=None):
+        self.callback = callback
+        self.file = open(trace, "w") if trace else None
+        self.start = self.last = time.perf_counter()
+
+    def __bool__(self):
+        return self.callback is not None or self.file is not None
+
+    def record(self, **fields):
+        now = time.perf_counter()
+        fields["seconds"] = now - self.last
+        fields["elapsed"] = now - self.start
+        fields["max_rss_kb"] = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource is not None else None
+        )
+        self.last = now
+        if self.callback is not None:
+            self.callback(fields)
+        if self.file is not None:
+            self.file.write(json.dumps(fields) + "\n")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def batch_intervals(batches, confidence=CONFIDENCE):
+    """
+    Return a dictionary mapping each page to a (low, high) confidence
+    interval for its PageRank, by the method of batch means over
+    `batches`, a list of dictionaries of visit frequencies per batch.
+
+    Successive samples are correlated, but the means of long enough
+    batches are close to independent, so their spread estimates the
+    standard error of the overall mean.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    count = len(batches)
+    intervals = {}
+    for page in batches[0]:
+        values = [batch[page] for batch in batches]
+        mean = sum(values) / count
+        if count > 1:
+            variance = sum((value - mean) ** 2 for value in values) / (count - 1)
+            error = z * math.sqrt(variance / count)
+        else:
+            error = math.inf
+        intervals[page] = (max(0.0, mean - error), min(1.0, mean + error))
+    return intervals
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -80,15 +267,26 @@ def transition_model(corpus, page, damping_factor):
     
     return tran_dict
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, callback=None, trace=None,
+                    batches=BATCHES, confidence=CONFIDENCE):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    If `callback` or a `trace` path is given, the samples are split into
+    `batches` batches, and after each one a record with the samples so
+    far and the widest confidence interval is reported. The last record
+    holds the interval for every page, from `batch_intervals`.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    tracer = Tracer(callback, trace)
+    ends = sorted({n * (b + 1) // batches for b in range(batches)} - {0})
+    previous = dict.fromkeys(corpus, 0)
+    frequencies = []
+
     sam_dict = corpus.copy()
 
     # Set initial counter page is zero
@@ -102,6 +300,23 @@ def sample_pagerank(corpus, damping_factor, n):
         # Set page choice in sam_dict
         sam_dict[sample_page] += 1
 
+        # Visit frequencies within each batch feed the batch means
+        if tracer and i + 1 == ends[len(frequencies)]:
+            size = i + 1 - (ends[len(frequencies) - 1] if frequencies else 0)
+            frequencies.append({
+                page: (count - previous[page]) / size for page, count in sam_dict.items()
+            })
+            previous = sam_dict.copy()
+            intervals = batch_intervals(frequencies, confidence)
+            fields = {
+                "batch": len(frequencies),
+                "samples": i + 1,
+                "max_half_width": max((high - low) / 2 for low, high in intervals.values()),
+            }
+            if i + 1 == n:
+                fields["intervals"] = intervals
+            tracer.record(**fields)
+
         # Get list of page, weights from transition model
         trans = transition_model(corpus, sample_page, damping_factor)
         pages = list(trans.keys())
@@ -112,16 +327,22 @@ def sample_pagerank(corpus, damping_factor, n):
 
         
 
+
     # Caculate the proportion of each page 
     for i in sam_dict:
         sam_dict[i] /= n
 
+    tracer.close()
     return sam_dict
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, callback=None,
+                     trace=None):
     """
     Return PageRank values for each page by iteratively updating
-    PageRank values until convergence.
+    PageRank values until no value changes by `tolerance` or more.
+
+    If `callback` or a `trace` path is given, a record of each iteration
+    is reported with the L1 and L-infinity norms of the change.
 
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
@@ -158,19 +379,1077 @@ def iterate_pagerank(corpus, damping_factor):
         pr = pr_1 + d * pr_2
         return pr     
 
+    tracer = Tracer(callback, trace)
+    iteration = 0
     while True:
         for page in corpus:
             new_rank[page] = pagerank(corpus, page, cur_rank, damping_factor)
         
         change = max([abs(new_rank[i] - cur_rank[i]) for i in cur_rank])
-        # Compare page ranks value change with 0,001
-        if change < 0.001:
+        iteration += 1
+        if tracer:
+            tracer.record(
+                iteration=iteration,
+                l1=sum(abs(new_rank[i] - cur_rank[i]) for i in cur_rank),
+                linf=change,
+            )
+
+        # Compare page ranks value change with the tolerance
+        if change < tolerance:
             break
         else:
             cur_rank = new_rank.copy()
     
+    tracer.close()
     return cur_rank
-    
+
+
+class TransitionMatrix():
+    """
+    Link structure of a corpus as a sparse matrix in CSR form, where
+    row j holds the pages linking to page j, weighted by 1 / (number of
+    links on the linking page). Pages without links are kept in a
+    separate dangling mask instead of being stored as N dense entries.
+    """
+
+    def __init__(self, corpus):
+        """
+        Build the matrix from a corpus as returned by `crawl`.
+        """
+        self.pages = sorted(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.size = len(self.pages)
+
+        sources = np.fromiter(
+            (self.index[page] for page in self.pages for _ in corpus[page]),
+            dtype=np.int64
+        )
+        targets = np.fromiter(
+            (self.index[link] for page in self.pages for link in corpus[page]),
+            dtype=np.int64
+        )
+        self.out_degree = np.bincount(sources, minlength=self.size)
+        self.dangling = self.out_degree == 0
+
+        # Links are generated page by page, so they are already grouped
+        # by linking page: the outgoing links of page i are a slice
+        self.out_indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(self.out_degree, out=self.out_indptr[1:])
+        self.out_links = targets
+
+        # Sort the links by target page to get one row per target
+        order = np.argsort(targets, kind="stable")
+        self.rows = targets[order]
+        self.indices = sources[order]
+        self.indptr = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=self.size), out=self.indptr[1:])
+        self.data = 1 / self.out_degree[self.indices]
+
+    def step(self, rank, damping_factor):
+        """
+        Return the ranks after one step of the random surfer from `rank`.
+        Dangling pages spread their rank evenly over all pages as a
+        rank-one correction rather than as explicit links.
+        """
+        followed = np.bincount(
+            self.rows, weights=self.data * rank[self.indices], minlength=self.size
+        )
+        spread = rank[self.dangling].sum() / self.size
+        return (1 - damping_factor) / self.size + damping_factor * (followed + spread)
+
+    def to_dict(self, rank):
+        """
+        Return a dictionary mapping each page to its value in `rank`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, rank)}
+
+    def add_pages(self, pages):
+        """
+        Add `pages`, without links, after the existing pages.
+        """
+        for page in pages:
+            self.index[page] = self.size
+            self.pages.append(page)
+            self.size += 1
+        grow = self.size - len(self.out_degree)
+        self.indptr = np.concatenate([self.indptr, np.full(grow, self.indptr[-1])])
+        self.out_indptr = np.concatenate([self.out_indptr, np.full(grow, self.out_indptr[-1])])
+        self.out_degree = np.concatenate([self.out_degree, np.zeros(grow, dtype=np.int64)])
+        self.dangling = self.out_degree == 0
+
+    def remove_pages(self, pages):
+        """
+        Remove `pages`, which must have no links to or from them left,
+        and renumber the pages after them.
+        Return the mask of the pages that were kept.
+        """
+        keep = np.ones(self.size, dtype=bool)
+        keep[[self.index[page] for page in pages]] = False
+
+        # Renumbering keeps the page order, and removed rows are empty,
+        # so their end offsets can just be dropped
+        renumber = np.cumsum(keep) - 1
+        self.rows = renumber[self.rows]
+        self.indices = renumber[self.indices]
+        self.out_links = renumber[self.out_links]
+        self.indptr = np.concatenate([[0], self.indptr[1:][keep]])
+        self.out_indptr = np.concatenate([[0], self.out_indptr[1:][keep]])
+        self.out_degree = self.out_degree[keep]
+        self.dangling = self.out_degree == 0
+
+        self.pages = [page for page, kept in zip(self.pages, keep) if kept]
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        self.size = len(self.pages)
+        return keep
+
+    def add_links(self, links):
+        """
+        Insert (source, target) pairs of page indexes, which must not
+        be linked yet, into both CSR forms in place.
+        """
+        if not links:
+            return
+
+        # Empty rows share an insert position, so links are inserted in
+        # row order to keep each one ahead of the rows after it
+        sources, targets = np.array(sorted(links, key=lambda link: link[1]), dtype=np.int64).T
+        at = self.indptr[targets + 1]
+        self.rows = np.insert(self.rows, at, targets)
+        self.indices = np.insert(self.indices, at, sources)
+        self.indptr[1:] += np.cumsum(np.bincount(targets, minlength=self.size))
+        sources, targets = np.array(sorted(links), dtype=np.int64).T
+        self.out_links = np.insert(self.out_links, self.out_indptr[sources + 1], targets)
+        self.out_indptr[1:] += np.cumsum(np.bincount(sources, minlength=self.size))
+        self.out_degree += np.bincount(sources, minlength=self.size)
+        self.reweight()
+
+    def remove_links(self, links):
+        """
+        Delete (source, target) pairs of page indexes from both CSR
+        forms in place.
+        """
+        if not links:
+            return
+        sources, targets = np.array(links, dtype=np.int64).T
+        at = [
+            self.indptr[target] + np.flatnonzero(
+                self.indices[self.indptr[target]:self.indptr[target + 1]] == source
+            )[0]
+            for source, target in links
+        ]
+        out_at = [
+            self.out_indptr[source] + np.flatnonzero(
+                self.out_links[self.out_indptr[source]:self.out_indptr[source + 1]] == target
+            )[0]
+            for source, target in links
+        ]
+        self.rows = np.delete(self.rows, at)
+        self.indices = np.delete(self.indices, at)
+        self.indptr[1:] -= np.cumsum(np.bincount(targets, minlength=self.size))
+        self.out_links = np.delete(self.out_links, out_at)
+        self.out_indptr[1:] -= np.cumsum(np.bincount(sources, minlength=self.size))
+        self.out_degree -= np.bincount(sources, minlength=self.size)
+        self.reweight()
+
+    def reweight(self):
+        """
+        Recompute link weights and the dangling mask from out_degree.
+        """
+        self.dangling = self.out_degree == 0
+        self.data = 1 / self.out_degree[self.indices]
+
+
+def spans(starts, counts):
+    """
+    Return the positions [start, start + count) for each pair of
+    `starts` and `counts`, concatenated into one array.
+    """
+    ends = np.cumsum(counts)
+    return np.repeat(starts - ends + counts, counts) + np.arange(ends[-1] if len(ends) else 0)
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS, initial=None, callback=None,
+                    trace=None):
+    """
+    Return PageRank values for each page by power iteration over a
+    sparse transition matrix, stopping once no value changes by more
+    than `tolerance` or after `max_iterations` iterations.
+
+    `initial` optionally maps pages to starting values, such as ranks
+    from before the corpus changed. Other pages start from 1 / N.
+    `callback` and `trace` report each iteration as in `iterate_pagerank`.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = TransitionMatrix(corpus)
+    rank = np.full(matrix.size, 1 / matrix.size)
+    if initial:
+        rank = np.array([initial.get(page, 1 / matrix.size) for page in matrix.pages])
+        rank /= rank.sum()
+    tracer = Tracer(callback, trace)
+    for iteration in range(1, max_iterations + 1):
+        new_rank = matrix.step(rank, damping_factor)
+        change = record_change(tracer, iteration, new_rank, rank)
+        rank = new_rank
+        if change < tolerance:
+            break
+    tracer.close()
+    return matrix.to_dict(rank / rank.sum())
+
+
+def record_change(tracer, iteration, new_rank, rank):
+    """
+    Return the largest change between two rank vectors, reporting the
+    iteration to `tracer` if it is tracing.
+    """
+    difference = np.abs(new_rank - rank)
+    change = float(difference.max())
+    if tracer:
+        tracer.record(iteration=iteration, l1=float(difference.sum()), linf=change)
+    return change
+
+
+def gauss_seidel_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS, callback=None, trace=None):
+    """
+    Return PageRank values by Gauss-Seidel iteration: pages are updated
+    in place, one after another, so each update already uses the new
+    values of the pages before it in the same sweep.
+    """
+    matrix = TransitionMatrix(corpus)
+    size = matrix.size
+    indptr = matrix.indptr.tolist()
+    indices = matrix.indices.tolist()
+    data = matrix.data.tolist()
+    dangling = matrix.dangling.tolist()
+    rank = [1 / size] * size
+    dangling_rank = sum(value for value, empty in zip(rank, dangling) if empty)
+    jump = (1 - damping_factor) / size
+
+    tracer = Tracer(callback, trace)
+    for iteration in range(1, max_iterations + 1):
+        old_rank = np.array(rank)
+        for page in range(size):
+            followed = 0
+            for edge in range(indptr[page], indptr[page + 1]):
+                followed += data[edge] * rank[indices[edge]]
+            value = jump + damping_factor * (followed + dangling_rank / size)
+            if dangling[page]:
+                dangling_rank += value - rank[page]
+            rank[page] = value
+
+        # Unlike power iteration, a sweep does not keep the sum at 1
+        rank_array = np.array(rank)
+        total = rank_array.sum()
+        rank_array /= total
+        rank = rank_array.tolist()
+        dangling_rank /= total
+        if record_change(tracer, iteration, rank_array, old_rank) < tolerance:
+            break
+    tracer.close()
+    return matrix.to_dict(rank_array / rank_array.sum())
+
+
+def extrapolated_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                          max_iterations=MAX_ITERATIONS, callback=None, trace=None,
+                          method="quadratic", period=EXTRAPOLATION_PERIOD):
+    """
+    Return PageRank values by power iteration that, every `period`
+    iterations, jumps ahead by extrapolating from the last iterates.
+
+    Method "aitken" applies Aitken's delta-squared process to each page
+    on its own. Method "quadratic" fits the last four iterates with the
+    two largest non-principal eigenvectors, as in quadratic extrapolation
+    (Kamvar et al.), and removes them.
+    """
+    matrix = TransitionMatrix(corpus)
+    rank = np.full(matrix.size, 1 / matrix.size)
+    history = []
+    tracer = Tracer(callback, trace)
+    for iteration in range(1, max_iterations + 1):
+        new_rank = matrix.step(rank, damping_factor)
+        change = record_change(tracer, iteration, new_rank, rank)
+        rank = new_rank
+        if change < tolerance:
+            break
+
+        history = (history + [rank])[-4:]
+        if iteration % period == 0 and len(history) == 4:
+            if method == "aitken":
+                rank = aitken(*history[-3:])
+            else:
+                rank = quadratic_extrapolation(*history)
+            history = []
+    tracer.close()
+    return matrix.to_dict(rank / rank.sum())
+
+
+def aitken(first, second, third):
+    """
+    Return Aitken's delta-squared extrapolation of three successive
+    rank vectors, leaving pages where it is undefined or negative at
+    their latest value.
+    """
+    curvature = third - 2 * second + first
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rank = third - (third - second) ** 2 / curvature
+    rank = np.where(np.isfinite(rank) & (rank > 0), rank, third)
+    return rank / rank.sum()
+
+
+def quadratic_extrapolation(first, second, third, fourth):
+    """
+    Return the quadratic extrapolation of four successive rank vectors.
+    """
+    y = np.column_stack((second - first, third - first))
+    gamma, *_ = np.linalg.lstsq(y, -(fourth - first), rcond=None)
+    gamma1, gamma2 = gamma
+    rank = (gamma1 + gamma2 + 1) * second + (gamma2 + 1) * third + fourth
+    rank = np.maximum(rank, 0)
+    if not rank.sum() > 0:
+        return fourth
+    return rank / rank.sum()
+
+
+def adaptive_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                      max_iterations=MAX_ITERATIONS, callback=None, trace=None,
+                      freeze=FREEZE_FRACTION):
+    """
+    Return PageRank values by adaptive power iteration: once a page
+    changes by less than `freeze` times the tolerance twice, the rank it gets
+    from links is frozen and its row of the matrix is no longer
+    multiplied. The rank spread by pages without links still reaches
+    every page.
+    """
+    matrix = TransitionMatrix(corpus)
+    size = matrix.size
+    rank = np.full(size, 1 / size)
+    active = np.ones(size, dtype=bool)
+    followed = np.zeros(size)
+    was_small = np.zeros(size, dtype=bool)
+    rows, weights, sources = matrix.rows, matrix.data, matrix.indices
+    tracer = Tracer(callback, trace)
+    for iteration in range(1, max_iterations + 1):
+        followed[active] = np.bincount(
+            rows, weights=weights * rank[sources], minlength=size
+        )[active]
+        spread = rank[matrix.dangling].sum() / size
+        new_rank = (1 - damping_factor) / size + damping_factor * (followed + spread)
+        change = record_change(tracer, iteration, new_rank, rank)
+        if change < tolerance:
+            rank = new_rank
+            break
+
+        # A page's change can pass through 0 while it is still moving, so
+        # it has to stay small for two iterations in a row
+        small = np.abs(new_rank - rank) < freeze * tolerance
+        converged = active & small & was_small
+        was_small = small
+        rank = new_rank
+        # Keep only the links into pages that are still changing
+        if converged.any():
+            active &= ~converged
+            keep = active[matrix.rows]
+            rows, weights, sources = matrix.rows[keep], matrix.data[keep], matrix.indices[keep]
+    tracer.close()
+    return matrix.to_dict(rank / rank.sum())
+
+
+# Solvers by name for solve_pagerank
+SOLVERS = {
+    "power": sparse_pagerank,
+    "gauss-seidel": gauss_seidel_pagerank,
+    "aitken": lambda *args, **kwargs: extrapolated_pagerank(*args, method="aitken", **kwargs),
+    "quadratic": extrapolated_pagerank,
+    "adaptive": adaptive_pagerank,
+}
+
+
+def solve_pagerank(corpus, damping_factor, solver="power", tolerance=TOLERANCE,
+                   **kwargs):
+    """
+    Return PageRank values computed by the solver named `solver`, one
+    of the keys of SOLVERS. All solvers stop once no value changes by
+    more than `tolerance` in an iteration.
+    """
+    if solver not in SOLVERS:
+        raise ValueError(f"unknown solver {solver!r}, expected one of {', '.join(SOLVERS)}")
+    return SOLVERS[solver](corpus, damping_factor, tolerance, **kwargs)
+
+
+class IncrementalPageRank():
+    """
+    PageRank values kept up to date as pages and links are added and
+    removed, instead of being recomputed from 1 / N after every change.
+
+    Both methods keep one TransitionMatrix and patch it in place. With
+    method "power", each update warm-starts power iteration from the
+    previous ranks. With method "push", every page keeps the residual
+    of its PageRank equation,
+
+        r(p) = (1 - d) / N + d * (D / N + sum of x(i) / links(i)) - x(p)
+
+    over the pages i linking to p, where D is the rank on pages without
+    links. An update recomputes only the residuals of the pages it
+    touched, then pushes residuals above `tolerance` times a page's
+    number of links into the ranks and along those links, a whole
+    frontier of pages at a time, so a small edit only does work near
+    the edit.
+    """
+
+    def __init__(self, corpus, damping_factor, tolerance=1e-10, method="push",
+                 ranks=None):
+        """
+        Start from a corpus as returned by `crawl`, and optionally the
+        `ranks` already computed for it.
+        """
+        if method not in ("power", "push"):
+            raise ValueError(f"unknown method {method!r}")
+        self.damping = damping_factor
+        self.tolerance = tolerance
+        self.method = method
+        self.links = {page: set(links) for page, links in corpus.items()}
+        self.matrix = TransitionMatrix(self.links)
+
+        if ranks is None:
+            ranks = sparse_pagerank(corpus, damping_factor)
+        self.rank = np.array([ranks.get(page, 1 / len(corpus)) for page in self.matrix.pages])
+        if method == "power":
+            self.iterate()
+            return
+
+        self.dangling_rank = self.rank[self.matrix.dangling].sum()
+
+        # A change to N or D moves every residual by the same amount,
+        # so that shift is kept once in `offset` rather than per page,
+        # and each page only stores its residual relative to it
+        self.offset = 0.0
+        pages = np.arange(self.matrix.size)
+        self.residual = self.exact_residual(pages)
+        self.push(pages)
+
+    def ranks(self):
+        """
+        Return the current PageRank values, normalized to sum to 1.
+        """
+        return self.matrix.to_dict(self.rank / self.rank.sum())
+
+    def update(self, added_pages=(), removed_pages=(), added_links=(),
+               removed_links=()):
+        """
+        Apply added and removed pages and (page, link) pairs, in that
+        order, and return the updated PageRank values.
+
+        As in `crawl`, links to pages outside the corpus and links from
+        a page to itself are ignored.
+        """
+        if self.method == "push":
+            before = self.uniform()
+
+        # Work out the net change first, so the matrix is patched once
+        new_pages = []
+        gone_pages = []
+        new_links = set()
+        gone_links = set()
+        for page in added_pages:
+            if page not in self.links:
+                self.links[page] = set()
+                new_pages.append(page)
+        for page in removed_pages:
+            if page not in self.links:
+                continue
+            for link in self.links.pop(page):
+                gone_links.add((page, link))
+            for linking, links in self.links.items():
+                if page in links:
+                    links.discard(page)
+                    gone_links.add((linking, page))
+            if page in new_pages:
+                new_pages.remove(page)
+            else:
+                gone_pages.append(page)
+        for page, link in added_links:
+            if page in self.links and link in self.links and page != link:
+                if link not in self.links[page]:
+                    self.links[page].add(link)
+                    if (page, link) in gone_links:
+                        gone_links.discard((page, link))
+                    else:
+                        new_links.add((page, link))
+        for page, link in removed_links:
+            if page in self.links and link in self.links[page]:
+                self.links[page].discard(link)
+                if (page, link) in new_links:
+                    new_links.discard((page, link))
+                else:
+                    gone_links.add((page, link))
+
+        # Pages whose links changed, and pages linked from them, need
+        # their residuals recomputed (gone pages are dropped below)
+        touched = set()
+        for page, link in itertools.chain(new_links, gone_links):
+            touched.add(page)
+            touched.add(link)
+            touched.update(self.links.get(page, ()))
+        touched.difference_update(gone_pages)
+
+        matrix = self.matrix
+        matrix.add_pages(new_pages)
+        grow = np.zeros(len(new_pages))
+        self.rank = np.concatenate([self.rank, grow])
+        matrix.remove_links([
+            (matrix.index[page], matrix.index[link]) for page, link in gone_links
+        ])
+        if gone_pages:
+            keep = matrix.remove_pages(gone_pages)
+            self.rank = self.rank[keep]
+        matrix.add_links([
+            (matrix.index[page], matrix.index[link]) for page, link in new_links
+        ])
+
+        if self.method == "power":
+            self.iterate()
+            return self.ranks()
+
+        # Move every residual by the change to the uniform term, which
+        # depends on N and D, before fixing the pages that were touched
+        self.residual = np.concatenate([self.residual, grow])
+        if gone_pages:
+            self.residual = self.residual[keep]
+        self.dangling_rank = self.rank[matrix.dangling].sum()
+        self.offset += self.uniform() - before
+        pages = np.array(
+            sorted(matrix.index[page] for page in touched | set(new_pages)),
+            dtype=np.int64
+        )
+        if len(pages):
+            self.residual[pages] = self.exact_residual(pages) - self.offset
+        self.push(pages)
+        return self.ranks()
+
+    def iterate(self):
+        """
+        Run power iteration from the current ranks until no value
+        changes by more than the tolerance.
+        """
+        rank = self.rank / self.rank.sum()
+        for _ in range(MAX_ITERATIONS):
+            new_rank = self.matrix.step(rank, self.damping)
+            change = np.abs(new_rank - rank).max()
+            rank = new_rank
+            if change < self.tolerance:
+                break
+        self.rank = rank
+
+    def uniform(self):
+        """
+        Return the rank every page receives from random jumps and from
+        pages without links.
+        """
+        return (1 - self.damping + self.damping * self.dangling_rank) / self.matrix.size
+
+    def exact_residual(self, pages):
+        """
+        Return the residuals of the page indexes `pages`, computed from
+        their incoming links.
+        """
+        matrix = self.matrix
+        counts = matrix.indptr[pages + 1] - matrix.indptr[pages]
+        edges = spans(matrix.indptr[pages], counts)
+        followed = np.bincount(
+            np.repeat(np.arange(len(pages)), counts),
+            weights=matrix.data[edges] * self.rank[matrix.indices[edges]],
+            minlength=len(pages)
+        )
+        return self.uniform() + self.damping * followed - self.rank[pages]
+
+    def push(self, pages):
+        """
+        Push residuals, starting from the page indexes `pages`, until no
+        page's residual is larger than the tolerance times its number
+        of links.
+
+        The shared offset is never pushed: a residual that is the same
+        on every page is solved by scaling all ranks by one factor,
+        which normalizing them in `ranks` already does.
+        """
+        matrix = self.matrix
+        limit = self.tolerance * np.maximum(matrix.out_degree, 1)
+        active = pages[np.abs(self.residual[pages]) > limit[pages]]
+        while len(active):
+            excess = self.residual[active]
+            self.rank[active] += excess
+            self.residual[active] = 0.0
+
+            # Rank on a page without links reaches every page
+            degree = matrix.out_degree[active]
+            spread = excess[degree == 0].sum()
+            self.dangling_rank += spread
+            self.offset += self.damping * spread / matrix.size
+
+            edges = spans(matrix.out_indptr[active], degree)
+            targets = matrix.out_links[edges]
+            shares = np.repeat(self.damping * excess / np.maximum(degree, 1), degree)
+            self.residual += np.bincount(targets, weights=shares, minlength=matrix.size)
+            targets = np.flatnonzero(np.bincount(targets, minlength=matrix.size))
+            active = targets[np.abs(self.residual[targets]) > limit[targets]]
+
+
+class PersonalizedPageRank():
+    """
+    Personalized PageRank queries over one corpus, where the random
+    surfer jumps to a query's seed pages instead of to any page.
+
+    Method "push" runs forward push in rounds with a shrinking threshold,
+    and method "monte-carlo" runs random walks from the seeds in batches.
+    Asked for the top k pages, both stop once `patience` rounds in a row
+    leave the top k unchanged. Results for recent seed sets are kept in an LRU
+    cache of `cache_size` entries.
+    """
+
+    def __init__(self, corpus, damping_factor, method="push", tolerance=1e-6,
+                 walks=100000, patience=3, cache_size=PERSONALIZED_CACHE, seed=None):
+        """
+        Prepare queries over a corpus as returned by `crawl`. `tolerance`
+        is the residual at which push stops, and `walks` the most random
+        walks Monte Carlo takes for one query.
+        """
+        if method not in ("push", "monte-carlo"):
+            raise ValueError(f"unknown method {method!r}")
+        self.damping = damping_factor
+        self.method = method
+        self.tolerance = tolerance
+        self.walks = walks
+        self.patience = patience
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.links = {page: sorted(links) for page, links in corpus.items()}
+        self.matrix = TransitionMatrix(corpus) if method == "monte-carlo" else None
+        self.rng = np.random.default_rng(seed)
+
+    def ranks(self, seeds):
+        """
+        Return personalized PageRank values for `seeds`, either pages
+        or a dictionary mapping pages to teleport weights.
+
+        Return a dictionary of the pages reached, with values that sum
+        to (about) 1. Pages that are left out have a value of (close to) 0.
+        """
+        return self.query(seeds, None)
+
+    def top(self, seeds, k):
+        """
+        Return the `k` pages with the highest personalized PageRank for
+        `seeds`, as a list of (page, value) pairs from highest down.
+        """
+        ranks = self.query(seeds, k)
+        return heapq.nlargest(k, ranks.items(), key=lambda item: item[1])
+
+    def query(self, seeds, k):
+        """
+        Return ranks for `seeds`, from the cache if they were computed
+        recently, stopping early once the top `k` are stable.
+
+        Each call returns a new dictionary, so callers may change it
+        without touching the cached copy.
+        """
+        teleport = self.teleport(seeds)
+        key = (frozenset(teleport.items()), k)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return dict(self.cache[key])
+
+        if self.method == "push":
+            ranks = self.forward_push(teleport, k)
+        else:
+            ranks = self.monte_carlo(teleport, k)
+        self.cache[key] = ranks
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return dict(ranks)
+
+    def teleport(self, seeds):
+        """
+        Return `seeds` as a dictionary of teleport probabilities.
+        """
+        if not isinstance(seeds, dict):
+            seeds = dict.fromkeys(seeds, 1)
+        unknown = [page for page in seeds if page not in self.links]
+        if unknown:
+            raise KeyError(f"pages not in corpus: {', '.join(sorted(unknown))}")
+        total = sum(seeds.values())
+        if not seeds or total <= 0:
+            raise ValueError("seeds must give some page a positive weight")
+        return {page: weight / total for page, weight in seeds.items() if weight > 0}
+
+    def forward_push(self, teleport, k):
+        """
+        Return personalized ranks for `teleport` by forward push. Each
+        round pushes every page whose residual is above the threshold,
+        then halves it, until it reaches the tolerance.
+
+        Rank that is still in residuals is not handed out, so the values
+        are lower bounds that sum to a little less than 1.
+        """
+        rank = {}
+        residual = dict(teleport)
+        threshold = max(self.tolerance, 0.01)
+        previous = None
+        stable = 0
+        while True:
+            queue = deque(page for page, value in residual.items() if value > threshold)
+            queued = set(queue)
+            while queue:
+                page = queue.popleft()
+                queued.discard(page)
+                mass = residual.pop(page)
+                rank[page] = rank.get(page, 0) + (1 - self.damping) * mass
+
+                # Surfers on pages without links jump back to the seeds
+                targets = self.links[page]
+                if targets:
+                    share = self.damping * mass / len(targets)
+                    shares = ((link, share) for link in targets)
+                else:
+                    shares = ((seed, self.damping * mass * weight)
+                              for seed, weight in teleport.items())
+                for link, share in shares:
+                    residual[link] = residual.get(link, 0) + share
+                    if link not in queued and residual[link] > threshold:
+                        queue.append(link)
+                        queued.add(link)
+
+            if threshold <= self.tolerance:
+                break
+            if k is not None and len(rank) >= k:
+                current = top_pages(rank, k)
+                stable = stable + 1 if current == previous else 0
+                if stable == self.patience:
+                    break
+                previous = current
+            threshold = max(self.tolerance, threshold / 2)
+        return rank
+
+    def monte_carlo(self, teleport, k):
+        """
+        Return personalized ranks for `teleport` by counting the pages
+        where random walks from the seeds end. Walks run in batches that
+        double in size, up to `walks` in all.
+        """
+        matrix = self.matrix
+        seeds = np.array([matrix.index[page] for page in teleport], dtype=np.int64)
+        weights = np.array(list(teleport.values()))
+        counts = np.zeros(matrix.size, dtype=np.int64)
+        batch = min(self.walks, 1000)
+        taken = 0
+        previous = None
+        stable = 0
+        while taken < self.walks:
+            batch = min(batch, self.walks - taken)
+            current = self.rng.choice(seeds, size=batch, p=weights)
+            while len(current):
+                # Each step a walk ends with probability 1 - d, and
+                # walks on pages without links jump back to the seeds
+                stop = self.rng.random(len(current)) >= self.damping
+                counts += np.bincount(current[stop], minlength=matrix.size)
+                current = current[~stop]
+                degree = matrix.out_degree[current]
+                choice = (self.rng.random(len(current)) * degree).astype(np.int64)
+                jump = degree == 0
+                following = current[~jump]
+                current[~jump] = matrix.out_links[matrix.out_indptr[following] + choice[~jump]]
+                current[jump] = self.rng.choice(seeds, size=int(jump.sum()), p=weights)
+            taken += batch
+            batch *= 2
+
+            if k is not None:
+                order = np.argsort(-counts, kind="stable")[:k]
+                current_top = frozenset(order[counts[order] > 0].tolist())
+                stable = stable + 1 if current_top == previous else 0
+                if stable == self.patience:
+                    break
+                previous = current_top
+
+        reached = np.flatnonzero(counts)
+        return {matrix.pages[i]: float(counts[i] / taken) for i in reached}
+
+
+def top_pages(ranks, k):
+    """
+    Return the set of the `k` pages with the highest values in `ranks`.
+    """
+    return frozenset(heapq.nlargest(k, ranks, key=ranks.get))
+
+
+class EdgeFile():
+    """
+    Link graph of a corpus stored in a directory on disk, for corpora
+    whose links do not fit in memory:
+
+        pages.txt       page names, one per line, in id order
+        sources.bin     int32 linking page of every link, and
+        targets.bin     int32 linked page, sorted by target
+        out_degree.bin  int32 number of links on every page
+        meta.json       number of pages and links
+        rank-*.bin      float64 rank vectors of `out_of_core_pagerank`
+
+    The arrays are memory-mapped, so they are only read as they are used.
+    """
+
+    def __init__(self, path):
+        """
+        Open the edge file written by `build` at `path`.
+        """
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.size = meta["pages"]
+        self.link_count = meta["links"]
+        self.sources = self.array("sources.bin", np.int32, self.link_count)
+        self.targets = self.array("targets.bin", np.int32, self.link_count)
+        self.out_degree = self.array("out_degree.bin", np.int32, self.size)
+
+    def array(self, name, dtype, length, mode="r"):
+        """
+        Return a memory map of the array file `name`, or an empty
+        array if it has no entries (which cannot be mapped).
+        """
+        if length == 0 and mode == "r":
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode=mode,
+                         shape=(length,))
+
+    @classmethod
+    def build(cls, path, pages, blocks, buckets=EDGE_BUCKETS):
+        """
+        Write an edge file to directory `path` and return it. `pages`
+        lists the page names in id order, and `blocks` yields
+        (sources, targets) pairs of arrays of page ids, one per link.
+
+        Links are sorted externally: they are first appended to one of
+        `buckets` files by range of target, then each bucket is sorted in
+        memory, so no more than one bucket is held at a time.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages.txt"), "w") as f:
+            size = 0
+            for page in pages:
+                f.write(page + "\n")
+                size += 1
+
+        out_degree = np.zeros(size, dtype=np.int64)
+        buckets = max(1, min(size, buckets))
+        bucket_files = [
+            open(os.path.join(path, f"bucket-{i}.bin"), "w+b") for i in range(buckets)
+        ]
+        link_count = 0
+        try:
+            for sources, targets in blocks:
+                sources = np.asarray(sources, dtype=np.int32)
+                targets = np.asarray(targets, dtype=np.int32)
+                out_degree += np.bincount(sources, minlength=size)
+                link_count += len(sources)
+                bucket = targets.astype(np.int64) * buckets // size
+                order = np.argsort(bucket, kind="stable")
+                bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+                for i in range(buckets):
+                    chosen = order[bounds[i]:bounds[i + 1]]
+                    if len(chosen):
+                        np.column_stack((sources[chosen], targets[chosen])).tofile(bucket_files[i])
+
+            graph_sources = open(os.path.join(path, "sources.bin"), "wb")
+            graph_targets = open(os.path.join(path, "targets.bin"), "wb")
+            with graph_sources, graph_targets:
+                for f in bucket_files:
+                    f.seek(0)
+                    links = np.fromfile(f, dtype=np.int32).reshape(-1, 2)
+                    links = links[np.argsort(links[:, 1], kind="stable")]
+                    links[:, 0].tofile(graph_sources)
+                    links[:, 1].tofile(graph_targets)
+        finally:
+            for f in bucket_files:
+                f.close()
+                os.remove(f.name)
+
+        out_degree.astype(np.int32).tofile(os.path.join(path, "out_degree.bin"))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({"pages": size, "links": link_count}, f)
+        return cls(path)
+
+    @classmethod
+    def from_corpus(cls, path, corpus, block_size=EDGE_BLOCK):
+        """
+        Write an edge file for a corpus as returned by `crawl`.
+        """
+        pages = sorted(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        links = ((index[page], index[link]) for page in pages for link in corpus[page])
+        return cls.build(path, pages, link_blocks(links, block_size))
+
+    @classmethod
+    def from_directory(cls, path, directory, block_size=EDGE_BLOCK):
+        """
+        Write an edge file for a directory of HTML pages, reading one
+        page at a time instead of crawling the whole corpus first.
+        """
+        pages = sorted(
+            filename for filename in os.listdir(directory) if filename.endswith(".html")
+        )
+        index = {page: i for i, page in enumerate(pages)}
+        links = (
+            (index[page], index[link])
+            for page in pages
+            for link in sorted(extract_links(os.path.join(directory, page)))
+            if link in index and link != page
+        )
+        return cls.build(path, pages, link_blocks(links, block_size))
+
+    def pages(self):
+        """
+        Return the list of page names, in id order.
+        """
+        with open(os.path.join(self.path, "pages.txt")) as f:
+            return f.read().splitlines()
+
+    def to_dict(self, rank):
+        """
+        Return a dictionary mapping each page to its value in `rank`.
+        """
+        return {page: float(value) for page, value in zip(self.pages(), rank)}
+
+
+def link_blocks(links, block_size=EDGE_BLOCK):
+    """
+    Yield (sources, targets) arrays of up to `block_size` links each
+    from an iterable of (source, target) page id pairs.
+    """
+    while True:
+        block = np.fromiter(
+            itertools.chain.from_iterable(itertools.islice(links, block_size)),
+            dtype=np.int32
+        )
+        if not len(block):
+            return
+        yield block[0::2], block[1::2]
+
+
+def out_of_core_pagerank(path, damping_factor, tolerance=TOLERANCE,
+                         max_iterations=MAX_ITERATIONS, block_size=EDGE_BLOCK,
+                         page_block=PAGE_BLOCK, callback=None, trace=None):
+    """
+    Return PageRank values for the edge file at `path`, by power
+    iteration that streams the links from disk `block_size` at a time.
+
+    The rank vectors are memory-mapped files in the same directory, so
+    memory use is bounded by the block sizes and the operating system's
+    page cache rather than by the size of the corpus. Return the ranks as
+    a memory-mapped array in page id order, normalized to sum to 1; use
+    `EdgeFile.to_dict` to turn small results into a dictionary.
+    """
+    graph = EdgeFile(path)
+    size = graph.size
+    rank = graph.array("rank-0.bin", np.float64, size, mode="w+")
+    new_rank = graph.array("rank-1.bin", np.float64, size, mode="w+")
+    rank[:] = 1 / size
+    pages = [(start, min(start + page_block, size)) for start in range(0, size, page_block)]
+
+    tracer = Tracer(callback, trace)
+    for iteration in range(1, max_iterations + 1):
+        spread = 0.0
+        for start, end in pages:
+            spread += rank[start:end][graph.out_degree[start:end] == 0].sum()
+            new_rank[start:end] = 0
+
+        # Links are sorted by target, so each block adds to one range
+        for start in range(0, graph.link_count, block_size):
+            sources = graph.sources[start:start + block_size]
+            targets = graph.targets[start:start + block_size]
+            weights = rank[sources] / graph.out_degree[sources]
+            first, last = int(targets[0]), int(targets[-1])
+            new_rank[first:last + 1] += np.bincount(
+                targets - first, weights=weights, minlength=last - first + 1
+            )
+
+        change = 0.0
+        total_change = 0.0
+        for start, end in pages:
+            block = new_rank[start:end]
+            block *= damping_factor
+            block += (1 - damping_factor) / size + damping_factor * spread / size
+            difference = np.abs(block - rank[start:end])
+            change = max(change, float(difference.max()))
+            total_change += float(difference.sum())
+        if tracer:
+            tracer.record(iteration=iteration, l1=total_change, linf=change)
+        rank, new_rank = new_rank, rank
+        if change < tolerance:
+            break
+    tracer.close()
+
+    total = sum(float(rank[start:end].sum()) for start, end in pages)
+    for start, end in pages:
+        rank[start:end] /= total
+    rank.flush()
+    return rank
+
+
+def vectorized_sample_pagerank(corpus, damping_factor, n, lanes=1000,
+                               burn_in=None, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    `lanes` independent random surfers moving in lockstep, drawing every
+    surfer's damping coin and link choice from one NumPy batch per step.
+
+    Each surfer starts on a random page and takes `burn_in` unrecorded
+    steps first (by default enough for the start to be forgotten to
+    within 0.1%). `seed` makes the sampling reproducible.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    matrix = TransitionMatrix(corpus)
+    rng = np.random.default_rng(seed)
+    lanes = max(1, min(lanes, n))
+    if burn_in is None:
+        burn_in = 0
+        if 0 < damping_factor < 1:
+            burn_in = math.ceil(math.log(0.001) / math.log(damping_factor))
+
+    def step(current):
+        # Follow a random link with probability d, if there is one,
+        # and otherwise jump to any page
+        degree = matrix.out_degree[current]
+        follow = (rng.random(len(current)) < damping_factor) & (degree > 0)
+        following = current[follow]
+        choice = (rng.random(len(following)) * degree[follow]).astype(np.int64)
+        next_pages = rng.integers(matrix.size, size=len(current))
+        next_pages[follow] = matrix.out_links[matrix.out_indptr[following] + choice]
+        return next_pages
+
+    current = rng.integers(matrix.size, size=lanes)
+    for _ in range(burn_in):
+        current = step(current)
+
+    # Count visits in batches rather than with an N-sized pass per step
+    counts = np.zeros(matrix.size, dtype=np.int64)
+    visited = []
+    taken = 0
+    while taken < n:
+        # The last step may only need some of the surfers
+        visited.append(current[:n - taken])
+        taken += len(visited[-1])
+        if len(visited) * lanes >= matrix.size or taken == n:
+            counts += np.bincount(np.concatenate(visited), minlength=matrix.size)
+            visited = []
+        current = step(current)
+
+    return matrix.to_dict(counts / n)
+
+
 if __name__ == "__main__":
     main()
 